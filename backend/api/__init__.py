@@ -1,5 +1,29 @@
 """
 API 路由包 - 包含所有 REST API 路由定义
+
+路由模块按需懒加载（PEP 562）：`from api import user_router` 时才导入对应模块。
 """
- 
-__version__ = "1.0.0" 
\ No newline at end of file
+
+import importlib
+
+__version__ = "1.0.0"
+
+# 导出名称 -> 路由所在子模块
+_ROUTERS = {
+    "user_router": ".user",
+    "news_pipeline_router": ".news_pipeline",
+    "enhanced_chat_router": ".enhanced_chat",
+    "user_memory_router": ".user_memory",
+    "news_agent_router": ".news_agent",
+}
+
+__all__ = list(_ROUTERS)
+
+
+def __getattr__(name):
+    module_name = _ROUTERS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    router = importlib.import_module(module_name, __name__).router
+    globals()[name] = router
+    return router
@@ -3,11 +3,18 @@
 基于向量检索的智能新闻问答接口
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status
+import asyncio
+
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Response, status
 from typing import Dict, Any, List, Optional
+from fastapi.responses import StreamingResponse
 from loguru import logger
+import orjson
 
 from core.auth import get_current_user
+from core.cache import cache
+from core.config import settings
+from core.database import Collections
 from services.enhanced_rag_chat_service import (
     EnhancedRAGChatService,
     RAGChatRequest,
@@ -17,8 +24,31 @@ from services.enhanced_rag_chat_service import (
 
 router = APIRouter(prefix="/api/enhanced-chat", tags=["增强RAG对话"])
 
+# 同时进行的 RAG 对话（检索 + 大模型调用）上限，突发流量在此排队而不是全部压到大模型接口上
+_chat_slots = asyncio.Semaphore(settings.MAX_CONCURRENT_REQUESTS)
+
 
-@router.post("/chat", response_model=RAGChatResponse)
+async def acquire_chat_slot():
+    """
+    对话准入控制：获取并发名额，排队超过 CHAT_ADMISSION_TIMEOUT 秒时返回 503
+    
+    请求结束后释放名额
+    """
+    try:
+        await asyncio.wait_for(_chat_slots.acquire(), timeout=settings.CHAT_ADMISSION_TIMEOUT)
+    except asyncio.TimeoutError:
+        logger.warning(f"对话请求排队超时，当前并发上限: {settings.MAX_CONCURRENT_REQUESTS}")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="对话服务繁忙，请稍后再试"
+        )
+    try:
+        yield
+    finally:
+        _chat_slots.release()
+
+
+@router.post("/chat", response_model=RAGChatResponse, dependencies=[Depends(acquire_chat_slot)])
 async def chat_with_rag(
     request: RAGChatRequest,
     current_user: Dict[str, Any] = Depends(get_current_user),
@@ -63,7 +93,44 @@ async def chat_with_rag(
         )
 
 
-@router.post("/quick-chat")
+@router.post("/chat/stream", dependencies=[Depends(acquire_chat_slot)])
+async def chat_with_rag_stream(
+    request: RAGChatRequest,
+    background_tasks: BackgroundTasks,
+    current_user: Dict[str, Any] = Depends(get_current_user),
+    chat_service: EnhancedRAGChatService = Depends(get_enhanced_rag_chat_service)
+):
+    """
+    基于RAG的流式对话（Server-Sent Events）
+    
+    依次推送 meta（会话与相关新闻）、token（增量文本）、done（统计与推荐）事件，
+    对话在响应结束后写库
+    
+    Args:
+        request: RAG对话请求
+        background_tasks: 后台任务
+        current_user: 当前用户信息
+        chat_service: RAG对话服务
+        
+    Returns:
+        StreamingResponse: text/event-stream 响应
+    """
+    request.user_id = current_user.get("user_id", "anonymous")
+    
+    logger.info(f"用户 {request.user_id} 开始RAG流式对话: {request.message[:50]}...")
+    
+    async def event_stream():
+        async for event in chat_service.chat_with_rag_stream(request, background_tasks):
+            yield b"data: " + orjson.dumps(event) + b"\n\n"
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.post("/quick-chat", dependencies=[Depends(acquire_chat_slot)])
 async def quick_chat(
     message: str,
     session_id: Optional[str] = None,
@@ -117,7 +184,7 @@ async def quick_chat(
         )
 
 
-@router.post("/news-qa")
+@router.post("/news-qa", dependencies=[Depends(acquire_chat_slot)])
 async def news_question_answer(
     question: str,
     news_topic: Optional[str] = None,
@@ -241,14 +308,14 @@ async def delete_conversation(
         user_id = current_user.get("user_id", "anonymous")
         
         # 从数据库删除
-        await chat_service.db[chat_service.db.Collections.CONVERSATIONS].delete_one({
+        await chat_service.db[Collections.CONVERSATIONS].delete_one({
             "session_id": session_id,
             "user_id": user_id
         })
         
-        # 从缓存删除
-        if session_id in chat_service.conversation_cache:
-            del chat_service.conversation_cache[session_id]
+        # 从缓存删除，并使对话列表缓存失效
+        chat_service.conversation_cache.pop(session_id, None)
+        await chat_service.invalidate_conversation_list(user_id)
         
         return {
             "success": True,
@@ -264,8 +331,61 @@ async def delete_conversation(
         )
 
 
+@router.delete("/conversations")
+async def delete_conversations(
+    ids: str = Query(..., description="以逗号分隔的会话ID列表"),
+    current_user: Dict[str, Any] = Depends(get_current_user),
+    chat_service: EnhancedRAGChatService = Depends(get_enhanced_rag_chat_service)
+):
+    """
+    批量删除对话（一次数据库往返）
+    
+    Args:
+        ids: 以逗号分隔的会话ID列表
+        current_user: 当前用户
+        chat_service: 对话服务
+    """
+    try:
+        user_id = current_user.get("user_id", "anonymous")
+        session_ids = list(dict.fromkeys(sid.strip() for sid in ids.split(",") if sid.strip()))
+        if not session_ids:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="会话ID列表不能为空"
+            )
+        
+        # 从数据库批量删除，只删除属于当前用户的会话
+        result = await chat_service.db[Collections.CONVERSATIONS].delete_many({
+            "session_id": {"$in": session_ids},
+            "user_id": user_id
+        })
+        
+        # 从缓存删除，并使对话列表缓存失效
+        conversation_cache = chat_service.conversation_cache
+        for session_id in session_ids:
+            conversation_cache.pop(session_id, None)
+        await chat_service.invalidate_conversation_list(user_id)
+        
+        return {
+            "success": True,
+            "message": "对话已删除",
+            "deleted_count": result.deleted_count,
+            "session_ids": session_ids
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"批量删除对话失败: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"批量删除对话失败: {str(e)}"
+        )
+
+
 @router.get("/user/conversations")
 async def get_user_conversations(
+    background_tasks: BackgroundTasks,
     limit: int = 10,
     current_user: Dict[str, Any] = Depends(get_current_user),
     chat_service: EnhancedRAGChatService = Depends(get_enhanced_rag_chat_service)
@@ -274,6 +394,7 @@ async def get_user_conversations(
     获取用户的所有对话列表
     
     Args:
+        background_tasks: 后台任务（响应返回后写入缓存）
         limit: 对话数量限制
         current_user: 当前用户
         chat_service: 对话服务
@@ -281,32 +402,66 @@ async def get_user_conversations(
     try:
         user_id = current_user.get("user_id", "anonymous")
         
-        # 从数据库查询用户的对话
-        conversations = await chat_service.db[chat_service.db.Collections.CONVERSATIONS].find(
-            {"user_id": user_id}
-        ).sort("updated_at", -1).limit(limit).to_list(length=limit)
+        # 先查缓存（按数量限制分字段存放已编码的响应体），命中时原样返回，无需反序列化再编码
+        cache_key = chat_service.conversation_list_cache_key(user_id)
+        cache_field = str(limit)
+        cached_body = await cache.hget(cache_key, cache_field)
+        if cached_body is not None:
+            return Response(content=cached_body, media_type="application/json")
+        
+        # 查询数据库前记下列表版本，回填时版本已变（期间对话被更新或删除）则放弃写入
+        version_key = chat_service.conversation_list_version_key(user_id)
+        version = await cache.get_version(version_key)
+        
+        # 从数据库查询用户的对话，只在服务端取出消息数与最后一条消息，不传输完整消息历史
+        # （匹配与排序走 user_updated_idx 索引）；直接遍历游标，不先整体物化为列表
+        cursor = chat_service.db[Collections.CONVERSATIONS].aggregate([
+            {"$match": {"user_id": user_id}},
+            {"$sort": {"updated_at": -1}},
+            {"$limit": limit},
+            {"$project": {
+                "_id": 0,
+                "session_id": 1,
+                "created_at": 1,
+                "updated_at": 1,
+                "message_count": {"$size": {"$ifNull": ["$messages", []]}},
+                "last_message": {"$arrayElemAt": [{"$ifNull": ["$messages", []]}, -1]}
+            }}
+        ])
         
         conversation_list = []
-        for conv in conversations:
-            # 获取最后一条消息作为预览
-            messages = conv.get("messages", [])
-            last_message = messages[-1] if messages else None
+        async for conv in cursor:
+            # 最后一条消息作为预览
+            last_message = conv.get("last_message")
             
             conversation_list.append({
                 "session_id": conv["session_id"],
                 "created_at": conv["created_at"],
                 "updated_at": conv["updated_at"],
-                "message_count": len(messages),
+                "message_count": conv["message_count"],
                 "last_message": last_message.get("content", "") if last_message else "",
                 "last_message_time": last_message.get("timestamp") if last_message else None
             })
         
-        return {
+        body = orjson.dumps({
             "success": True,
             "user_id": user_id,
             "conversation_count": len(conversation_list),
             "conversations": conversation_list
-        }
+        })
+        
+        # 缓存写入放到响应返回之后执行，不占用请求耗时
+        background_tasks.add_task(
+            cache.hset_if_version,
+            cache_key,
+            cache_field,
+            body,
+            version_key,
+            version,
+            expire=chat_service.CONVERSATION_LIST_CACHE_TTL
+        )
+        
+        return Response(content=body, media_type="application/json")
         
     except Exception as e:
         logger.error(f"获取用户对话列表失败: {e}")
@@ -0,0 +1,53 @@
+"""
+智能新闻助手 API
+基于 LangGraph 智能体的新闻搜索与对话接口
+"""
+
+from fastapi import APIRouter, Depends
+from typing import Dict, Any
+from fastapi.responses import StreamingResponse
+from loguru import logger
+import orjson
+
+from core.auth import get_current_user
+from models.agent import ChatMessage
+
+router = APIRouter(prefix="/api/news-agent", tags=["智能新闻助手"])
+
+
+@router.post("/chat/stream")
+async def chat_with_agent_stream(
+    request: ChatMessage,
+    current_user: Dict[str, Any] = Depends(get_current_user)
+):
+    """
+    智能新闻助手流式对话（Server-Sent Events）
+    
+    依次推送 token（增量文本）、done（完整结果，结构与非流式处理结果相同）事件；
+    智能对话回复边生成边推送，其它意图只推送 done 事件
+    
+    Args:
+        request: 聊天消息
+        current_user: 当前用户信息
+        
+    Returns:
+        StreamingResponse: text/event-stream 响应
+    """
+    user_id = current_user.get("user_id", "anonymous")
+    
+    logger.info(f"用户 {user_id} 开始智能助手流式对话: {request.message[:50]}...")
+    
+    # 智能体依赖 LangChain/LangGraph，导入较重，首次请求时才加载
+    from services.news_agent_service import get_news_agent_service
+    agent = await get_news_agent_service(request.model_name)
+    
+    async def event_stream():
+        async for event in agent.stream_user_message(user_id, request.session_id, request.message):
+            # 搜索结果中可能含有 ObjectId 等非 JSON 原生类型，统一转为字符串
+            yield b"data: " + orjson.dumps(event, default=str) + b"\n\n"
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -405,7 +405,8 @@ async def get_user_search_history(
 
         # 查询用户搜索历史
         cursor = db[Collections.SEARCH_HISTORY].find(
-            {"user_id": current_user["id"]}
+            {"user_id": current_user["id"]},
+            projection={"query": 1, "timestamp": 1, "results_count": 1, "cards_generated": 1}
         ).sort("timestamp", -1).limit(limit)
 
         history = []
@@ -439,6 +440,8 @@ async def add_search_record(
     try:
         from core.database import get_mongodb_database, Collections
         from datetime import datetime
+        from pymongo import ReturnDocument
+        from pymongo.errors import DuplicateKeyError
         import uuid
 
         query = request.get("query", "").strip()
@@ -455,32 +458,28 @@ async def add_search_record(
                 detail="数据库连接失败"
             )
 
-        # 创建搜索记录
-        search_record = {
-            "_id": str(uuid.uuid4()),
-            "user_id": current_user["id"],
-            "query": query,
-            "timestamp": datetime.utcnow(),
-            "metadata": request.get("metadata", {})
-        }
-
-        # 检查是否已存在相同查询，如果存在则更新时间戳
-        existing = await db[Collections.SEARCH_HISTORY].find_one({
-            "user_id": current_user["id"],
-            "query": query
-        })
-
-        if existing:
-            # 更新现有记录的时间戳
-            await db[Collections.SEARCH_HISTORY].update_one(
-                {"_id": existing["_id"]},
-                {"$set": {"timestamp": datetime.utcnow()}}
+        # 相同查询已存在时只更新时间戳，否则插入新记录；一次往返完成查找与写入
+        async def upsert_record():
+            return await db[Collections.SEARCH_HISTORY].find_one_and_update(
+                {"user_id": current_user["id"], "query": query},
+                {
+                    "$set": {"timestamp": datetime.utcnow()},
+                    "$setOnInsert": {
+                        "_id": str(uuid.uuid4()),
+                        "metadata": request.get("metadata", {})
+                    }
+                },
+                projection={"_id": 1},
+                upsert=True,
+                return_document=ReturnDocument.AFTER
             )
-            record_id = str(existing["_id"])
-        else:
-            # 插入新记录
-            await db[Collections.SEARCH_HISTORY].insert_one(search_record)
-            record_id = search_record["_id"]
+
+        try:
+            record = await upsert_record()
+        except DuplicateKeyError:
+            # 并发请求已插入同一查询（唯一索引 user_query_idx），重试一次即命中已有记录
+            record = await upsert_record()
+        record_id = str(record["_id"])
 
         return {
             "status": "success",
@@ -3,6 +3,8 @@
 提供用户行为记录、兴趣学习、个性化推荐等功能
 """
 
+import asyncio
+
 from fastapi import APIRouter, Depends, HTTPException, status
 from typing import Dict, Any, List, Optional
 from loguru import logger
@@ -307,20 +309,16 @@ async def get_user_memory_analytics(
     try:
         user_id = current_user.get("user_id", "anonymous")
         
-        # 获取用户行为统计
-        behavior_stats = {}
-        for action in memory_service.behavior_weights.keys():
-            count = await memory_service.db[memory_service.db.Collections.API_LOGS].count_documents({
-                "user_id": user_id,
-                "action": action
-            })
-            behavior_stats[action] = count
-        
-        # 获取兴趣档案
-        profile = await memory_service._get_user_interest_profile(user_id)
+        # 并发获取用户行为统计（一次聚合按行为类型分组计数）与兴趣档案（其中已包含个性化分数）
+        behavior_stats, profile = await asyncio.gather(
+            memory_service._get_behavior_stats(user_id),
+            memory_service._get_user_interest_profile(user_id)
+        )
         
-        # 计算个性化分数
-        personalization_score = await memory_service._calculate_personalization_score(user_id)
+        # 个性化分数复用兴趣档案的结果，档案为空时再单独计算
+        personalization_score = profile.get("profile_strength")
+        if personalization_score is None:
+            personalization_score = await memory_service._calculate_personalization_score(user_id)
         
         return {
             "success": True,
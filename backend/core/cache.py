@@ -3,9 +3,11 @@ Redis 缓存管理模块
 """
 
 import redis.asyncio as aioredis
-import json
-from typing import Any, Optional, Union
+import orjson
+from functools import lru_cache
+from typing import Any, List, Optional, Sequence, Type, TypeVar, Union
 from loguru import logger
+from pydantic import BaseModel, TypeAdapter
 
 from .config import settings
 
@@ -27,10 +29,10 @@ async def init_redis():
         
         # 测试连接
         await redis_pool.ping()
-        logger.info(f"Redis 连接成功: {settings.REDIS_URL}")
+        logger.info("Redis 连接成功: {}", settings.REDIS_URL)
         
     except Exception as e:
-        logger.error(f"Redis 连接失败: {e}")
+        logger.error("Redis 连接失败: {}", e)
         redis_pool = None
 
 
@@ -49,11 +51,37 @@ async def get_redis():
     return redis_pool
 
 
+ModelT = TypeVar("ModelT", bound=BaseModel)
+
+
+@lru_cache(maxsize=None)
+def _list_adapter(model_cls: Type[BaseModel]) -> TypeAdapter:
+    """模型列表的序列化/校验器（按模型类缓存，构建开销只发生一次）"""
+    return TypeAdapter(List[model_cls])
+
+
+# 仅当版本键的值仍等于读取数据前的版本时才写入哈希字段，防止失效之后回填旧数据
+# KEYS[1]=哈希键 KEYS[2]=版本键；ARGV: 字段, 值, 期望版本（无版本时为空串）, 过期时间
+_HSET_IF_VERSION_SCRIPT = """
+local current = redis.call("GET", KEYS[2]) or ""
+if current ~= ARGV[3] then
+    return 0
+end
+redis.call("HSET", KEYS[1], ARGV[1], ARGV[2])
+redis.call("EXPIRE", KEYS[1], ARGV[4])
+return 1
+"""
+
+
 class CacheManager:
     """缓存管理器"""
     
+    # SCAN 每次遍历的键数量，也是批量删除的批大小
+    SCAN_BATCH_SIZE = 500
+    
     def __init__(self):
         self.redis = None
+        self._hset_if_version_script = None
     
     async def _get_redis(self):
         """获取 Redis 连接"""
@@ -75,7 +103,7 @@ class CacheManager:
             
             # 序列化值
             if isinstance(value, (dict, list)):
-                value = json.dumps(value, ensure_ascii=False)
+                value = orjson.dumps(value).decode("utf-8")
             
             if expire:
                 await redis.setex(key, expire, value)
@@ -85,7 +113,7 @@ class CacheManager:
             return True
             
         except Exception as e:
-            logger.error(f"设置缓存失败 {key}: {e}")
+            logger.error("设置缓存失败 {}: {}", key, e)
             return False
     
     async def get(self, key: str) -> Optional[Any]:
@@ -101,12 +129,74 @@ class CacheManager:
             
             # 尝试反序列化
             try:
-                return json.loads(value)
-            except (json.JSONDecodeError, TypeError):
+                return orjson.loads(value)
+            except (orjson.JSONDecodeError, TypeError):
                 return value
                 
         except Exception as e:
-            logger.error(f"获取缓存失败 {key}: {e}")
+            logger.error("获取缓存失败 {}: {}", key, e)
+            return None
+    
+    async def set_json(
+        self,
+        key: str,
+        value: Union[BaseModel, Sequence[BaseModel]],
+        expire: Optional[int] = None
+    ) -> bool:
+        """
+        缓存 Pydantic 模型或模型列表
+        
+        直接由 pydantic-core 序列化为 JSON，不经过 .dict() 逐字段构建 Python 字典
+        
+        Args:
+            key: 缓存键
+            value: 模型实例或同类模型的列表
+            expire: 过期时间（秒）
+        """
+        try:
+            if isinstance(value, BaseModel):
+                payload = value.model_dump_json()
+            elif value:
+                payload = _list_adapter(type(value[0])).dump_json(list(value))
+            else:
+                payload = "[]"
+        except Exception as e:
+            logger.error("序列化缓存失败 {}: {}", key, e)
+            return False
+        
+        return await self.set(key, payload, expire=expire)
+    
+    async def get_json(
+        self,
+        key: str,
+        model_cls: Type[ModelT]
+    ) -> Optional[Union[ModelT, List[ModelT]]]:
+        """
+        读取由 set_json 写入的模型或模型列表
+        
+        Args:
+            key: 缓存键
+            model_cls: 模型类
+            
+        Returns:
+            模型实例或模型列表，未命中或数据无效时返回 None
+        """
+        try:
+            redis = await self._get_redis()
+            if redis is None:
+                return None
+            
+            value = await redis.get(key)
+            if value is None:
+                return None
+            
+            # 直接从 JSON 校验构建模型，不先解析为中间字典
+            if value.startswith("["):
+                return _list_adapter(model_cls).validate_json(value)
+            return model_cls.model_validate_json(value)
+            
+        except Exception as e:
+            logger.error("获取缓存失败 {}: {}", key, e)
             return None
     
     async def delete(self, key: str) -> bool:
@@ -120,7 +210,99 @@ class CacheManager:
             return result > 0
             
         except Exception as e:
-            logger.error(f"删除缓存失败 {key}: {e}")
+            logger.error("删除缓存失败 {}: {}", key, e)
+            return False
+    
+    async def hget(self, key: str, field: str) -> Optional[str]:
+        """获取哈希字段的原始值（不做反序列化，适合直接作为响应体返回）"""
+        try:
+            redis = await self._get_redis()
+            if redis is None:
+                return None
+            
+            return await redis.hget(key, field)
+            
+        except Exception as e:
+            logger.error("获取哈希缓存失败 {}[{}]: {}", key, field, e)
+            return None
+    
+    async def get_version(self, version_key: str) -> str:
+        """读取版本键的当前值，不存在时返回空串"""
+        try:
+            redis = await self._get_redis()
+            if redis is None:
+                return ""
+            
+            return await redis.get(version_key) or ""
+            
+        except Exception as e:
+            logger.error("获取缓存版本失败 {}: {}", version_key, e)
+            return ""
+    
+    async def hset_if_version(
+        self,
+        key: str,
+        field: str,
+        value: Union[str, bytes],
+        version_key: str,
+        version: str,
+        expire: int
+    ) -> bool:
+        """
+        版本未变化时设置哈希字段（原子检查并写入）
+        
+        Args:
+            key: 哈希键
+            field: 字段
+            value: 原始值
+            version_key: 版本键，需与哈希键位于同一槽位（集群部署时使用 {hash tag}）
+            version: 读取数据前通过 get_version 取得的版本
+            expire: 哈希键过期时间（秒）
+            
+        Returns:
+            bool: 是否写入；期间数据已失效时返回 False
+        """
+        try:
+            redis = await self._get_redis()
+            if redis is None:
+                return False
+            
+            if self._hset_if_version_script is None:
+                self._hset_if_version_script = redis.register_script(_HSET_IF_VERSION_SCRIPT)
+            
+            written = await self._hset_if_version_script(
+                keys=[key, version_key], args=[field, value, version, expire]
+            )
+            return bool(written)
+            
+        except Exception as e:
+            logger.error("设置哈希缓存失败 {}[{}]: {}", key, field, e)
+            return False
+    
+    async def invalidate_versioned(self, key: str, version_key: str, version_expire: int) -> bool:
+        """
+        删除缓存并递增其版本，使读取期间开始的回填写入失效
+        
+        Args:
+            key: 缓存键
+            version_key: 版本键
+            version_expire: 版本键过期时间（秒），应不短于一次读取与回填的最长耗时
+        """
+        try:
+            redis = await self._get_redis()
+            if redis is None:
+                return False
+            
+            async with redis.pipeline(transaction=True) as pipe:
+                pipe.incr(version_key)
+                pipe.expire(version_key, version_expire)
+                pipe.delete(key)
+                await pipe.execute()
+            
+            return True
+            
+        except Exception as e:
+            logger.error("失效缓存失败 {}: {}", key, e)
             return False
     
     async def exists(self, key: str) -> bool:
@@ -134,7 +316,7 @@ class CacheManager:
             return result > 0
             
         except Exception as e:
-            logger.error(f"检查缓存存在性失败 {key}: {e}")
+            logger.error("检查缓存存在性失败 {}: {}", key, e)
             return False
     
     async def expire(self, key: str, seconds: int) -> bool:
@@ -148,40 +330,45 @@ class CacheManager:
             return result
             
         except Exception as e:
-            logger.error(f"设置缓存过期时间失败 {key}: {e}")
+            logger.error("设置缓存过期时间失败 {}: {}", key, e)
             return False
     
     async def keys(self, pattern: str) -> list:
-        """获取匹配模式的键列表"""
+        """获取匹配模式的键列表（SCAN 增量遍历，不阻塞 Redis）"""
         try:
             redis = await self._get_redis()
             if redis is None:
                 return []
             
-            keys = await redis.keys(pattern)
-            return keys
+            return [key async for key in redis.scan_iter(match=pattern, count=self.SCAN_BATCH_SIZE)]
             
         except Exception as e:
-            logger.error(f"获取键列表失败 {pattern}: {e}")
+            logger.error("获取键列表失败 {}: {}", pattern, e)
             return []
     
     async def flush_pattern(self, pattern: str) -> int:
-        """清空匹配模式的缓存"""
+        """清空匹配模式的缓存（边遍历边分批 UNLINK，不一次性加载全部键，也不长时间阻塞 Redis）"""
         try:
-            keys = await self.keys(pattern)
-            if not keys:
-                return 0
-            
             redis = await self._get_redis()
             if redis is None:
                 return 0
             
-            result = await redis.delete(*keys)
-            logger.info(f"清空缓存模式 {pattern}: {result} 个键")
+            # UNLINK 在后台线程释放内存，比 DEL 更少占用 Redis 主线程
+            result = 0
+            batch = []
+            async for key in redis.scan_iter(match=pattern, count=self.SCAN_BATCH_SIZE):
+                batch.append(key)
+                if len(batch) >= self.SCAN_BATCH_SIZE:
+                    result += await redis.unlink(*batch)
+                    batch.clear()
+            if batch:
+                result += await redis.unlink(*batch)
+            
+            logger.info("清空缓存模式 {}: {} 个键", pattern, result)
             return result
             
         except Exception as e:
-            logger.error(f"清空缓存模式失败 {pattern}: {e}")
+            logger.error("清空缓存模式失败 {}: {}", pattern, e)
             return 0
 
 
@@ -46,6 +46,7 @@ class Settings(BaseSettings):
     DASHSCOPE_API_KEY: str = Field(default="", description="阿里云灵积 API 密钥")
     AVAILABLE_AI_MODELS: List[str] = Field(default=["qwen-turbo", "qwen-plus", "qwen-max"], description="可用的AI模型列表")
     DEFAULT_AI_MODEL: str = Field(default="qwen-turbo", description="默认AI模型")
+    LLM_MAX_CONCURRENCY: int = Field(default=16, description="智能助手 LLM 最大并发调用数")
     
     # 向量数据库配置
     PINECONE_API_KEY: str = Field(default="", description="Pinecone API 密钥")
@@ -58,6 +59,11 @@ class Settings(BaseSettings):
     # 数据库配置
     MONGODB_URL: str = Field(default="mongodb://localhost:27017", description="MongoDB 连接URL")
     MONGODB_DB_NAME: str = Field(default="news_mosaic", description="MongoDB 数据库名")
+    MONGODB_MAX_POOL_SIZE: int = Field(default=200, description="MongoDB 连接池最大连接数")
+    MONGODB_MIN_POOL_SIZE: int = Field(default=10, description="MongoDB 连接池保持的最小连接数")
+    MONGODB_COMPRESSORS: str = Field(default="zstd,snappy", description="MongoDB 网络压缩算法")
+    MONGODB_SERVER_SELECTION_TIMEOUT_MS: int = Field(default=2000, description="MongoDB 服务器选择超时(毫秒)")
+    MONGODB_WAIT_QUEUE_TIMEOUT_MS: int = Field(default=1000, description="MongoDB 等待连接池超时(毫秒)")
     
     # Redis 配置
     REDIS_HOST: str = Field(default="localhost", description="Redis 主机")
@@ -80,6 +86,7 @@ class Settings(BaseSettings):
     # 缓存配置
     CACHE_TTL: int = Field(default=3600, description="缓存过期时间（秒）")
     CACHE_MAX_SIZE: int = Field(default=1000, description="缓存最大大小")
+    SESSION_MEMORY_CACHE_ENABLED: bool = Field(default=True, description="启用进程内会话记忆缓存（仅适用于单进程或按会话粘滞路由的部署）")
     
     # 定时任务配置
     NEWS_FETCH_INTERVAL: int = Field(default=300, description="新闻获取间隔（秒）")
@@ -102,6 +109,7 @@ class Settings(BaseSettings):
     # 限流配置
     RATE_LIMIT_PER_MINUTE: int = Field(default=60, description="每分钟请求限制")
     MAX_CONCURRENT_REQUESTS: int = Field(default=10, description="最大并发请求数")
+    CHAT_ADMISSION_TIMEOUT: float = Field(default=10.0, description="对话请求排队等待上限（秒），超时返回 503")
     
     # Embedding 配置
     EMBEDDING_MODEL: str = Field(default="text-embedding-v3", description="QWen Embedding 模型")
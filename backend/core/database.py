@@ -4,6 +4,7 @@
 
 import asyncio
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ASCENDING, DESCENDING, IndexModel
 from loguru import logger
 from typing import Optional
 
@@ -17,6 +18,7 @@ mongodb_database = None
 async def init_database():
     """初始化数据库连接"""
     await init_mongodb()
+    await ensure_indexes()
 
 
 async def close_database():
@@ -29,15 +31,24 @@ async def init_mongodb():
     global mongodb_client, mongodb_database
     
     try:
-        mongodb_client = AsyncIOMotorClient(settings.MONGODB_URL)
+        # 连接池保持常驻连接，避免空闲后首个请求重新握手；压缩算法不可用时驱动会自动忽略
+        mongodb_client = AsyncIOMotorClient(
+            settings.MONGODB_URL,
+            maxPoolSize=settings.MONGODB_MAX_POOL_SIZE,
+            minPoolSize=settings.MONGODB_MIN_POOL_SIZE,
+            compressors=settings.MONGODB_COMPRESSORS,
+            serverSelectionTimeoutMS=settings.MONGODB_SERVER_SELECTION_TIMEOUT_MS,
+            waitQueueTimeoutMS=settings.MONGODB_WAIT_QUEUE_TIMEOUT_MS,
+            retryWrites=True,
+        )
         mongodb_database = mongodb_client[settings.MONGODB_DB_NAME]
         
         # 测试连接
         await mongodb_client.admin.command('ping')
-        logger.info(f"MongoDB 连接成功: {settings.MONGODB_URL}")
+        logger.info("MongoDB 连接成功: {}", settings.MONGODB_URL)
         
     except Exception as e:
-        logger.error(f"MongoDB 连接失败: {e}")
+        logger.error("MongoDB 连接失败: {}", e)
         mongodb_client = None
         mongodb_database = None
 
@@ -58,6 +69,64 @@ async def get_mongodb_database():
     return mongodb_database
 
 
+async def ensure_indexes():
+    """创建常用查询所需的索引：每个集合一次 create_indexes，各集合并发执行"""
+    if mongodb_database is None:
+        return
+    
+    index_specs = {
+        Collections.NEWS: [
+            IndexModel([("session_id", ASCENDING), ("title", ASCENDING), ("url", ASCENDING)], name="dedupe_idx"),
+            IndexModel([("session_id", ASCENDING), ("date", DESCENDING)], name="session_date_idx"),
+            IndexModel([("session_id", ASCENDING), ("keywords", ASCENDING)], name="session_keywords_idx"),
+            IndexModel([("url", ASCENDING)], name="url_idx"),
+            # 过期新闻由 MongoDB TTL 后台线程按 expire_at 直接删除
+            IndexModel([("expire_at", ASCENDING)], name="expire_ttl_idx", expireAfterSeconds=0)
+        ],
+        Collections.CONVERSATIONS: [
+            IndexModel([("session_id", ASCENDING), ("user_id", ASCENDING)], name="session_user_idx"),
+            IndexModel([("user_id", ASCENDING), ("updated_at", DESCENDING)], name="user_updated_idx")
+        ],
+        Collections.SEARCH_HISTORY: [
+            # 唯一索引：并发 upsert 同一查询时只会插入一条记录
+            IndexModel([("user_id", ASCENDING), ("query", ASCENDING)], name="user_query_idx", unique=True),
+            IndexModel([("user_id", ASCENDING), ("timestamp", DESCENDING)], name="user_timestamp_idx")
+        ],
+        Collections.API_LOGS: [
+            IndexModel([("user_id", ASCENDING), ("action", ASCENDING)], name="user_action_idx"),
+            IndexModel([("user_id", ASCENDING), ("timestamp", DESCENDING)], name="user_timestamp_idx")
+        ],
+        Collections.USER_PREFERENCES: [
+            IndexModel([("user_id", ASCENDING)], name="user_idx")
+        ]
+    }
+    
+    await _drop_non_unique_search_history_index()
+    
+    results = await asyncio.gather(
+        *[mongodb_database[name].create_indexes(models) for name, models in index_specs.items()],
+        return_exceptions=True
+    )
+    for name, result in zip(index_specs, results):
+        if isinstance(result, Exception):
+            # 索引创建失败不影响服务启动，查询仍可正常执行
+            logger.warning("创建集合 {} 的索引失败: {}", name, result)
+
+
+async def _drop_non_unique_search_history_index():
+    """旧版本创建的 user_query_idx 不是唯一索引，同名索引选项不同时无法重建，先删除"""
+    try:
+        collection = mongodb_database[Collections.SEARCH_HISTORY]
+        index_info = await collection.index_information()
+        old_index = index_info.get("user_query_idx")
+        if old_index is not None and not old_index.get("unique"):
+            await collection.drop_index("user_query_idx")
+            logger.info("已删除非唯一的搜索记录索引 user_query_idx，将重建为唯一索引")
+    except Exception as e:
+        # 已有重复的 (user_id, query) 记录时唯一索引无法创建，需先清理重复记录
+        logger.warning("检查搜索记录索引失败: {}", e)
+
+
 
 
 
@@ -0,0 +1,11 @@
+"""
+大模型调用并发限制模块
+进程内所有直接调用大模型的服务共享同一个并发上限
+"""
+
+import asyncio
+
+from core.config import settings
+
+# 进程内 LLM 调用并发上限（LLM_MAX_CONCURRENCY）
+llm_semaphore = asyncio.Semaphore(settings.LLM_MAX_CONCURRENCY)
@@ -0,0 +1,59 @@
+"""
+进程内请求合并（single-flight）模块
+相同键的并发调用只执行一次，其余调用等待并共享同一结果
+"""
+
+import asyncio
+import hashlib
+from typing import Any, Awaitable, Callable, Dict
+
+
+def flight_key(*parts: Any) -> str:
+    """
+    由请求参数生成合并键
+
+    Args:
+        parts: 决定结果的全部参数
+
+    Returns:
+        str: 参数的 blake2b 摘要
+    """
+    raw = "|".join(str(part) for part in parts)
+    return hashlib.blake2b(raw.encode("utf-8"), digest_size=16).hexdigest()
+
+
+class SingleFlight:
+    """进程内请求合并器"""
+
+    def __init__(self):
+        self._inflight: Dict[str, asyncio.Task] = {}
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        执行或加入同键的进行中调用
+
+        fn 在独立任务中运行，任一调用者被取消都不会影响该任务及其他等待者
+
+        Args:
+            key: 合并键
+            fn: 无参协程函数，同键并发调用中只执行一次
+
+        Returns:
+            Any: fn 的返回值（同键并发调用共享同一对象，调用方不应修改）
+        """
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._on_done(key, done))
+
+        # shield：调用者被取消时只取消自身的等待，不取消共享任务
+        return await asyncio.shield(task)
+
+    def _on_done(self, key: str, task: asyncio.Task) -> None:
+        """任务结束后移出进行中表"""
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # 所有等待者都已取消时，标记异常已读取，避免事件循环告警
+        if not task.cancelled():
+            task.exception()
@@ -7,8 +7,11 @@ News Mosaic - 多模态大模型新闻搜索分析工具
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, ORJSONResponse
 from contextlib import asynccontextmanager
+import sys
+from datetime import datetime
+from time import monotonic as _monotonic
 import uvicorn
 from loguru import logger
 
@@ -17,6 +20,7 @@ from core.database import init_database, close_database
 from core.cache import init_redis, close_redis
 from api import user
 from services.background_tasks import init_celery
+from services.news_service import news_service
 
 
 @asynccontextmanager
@@ -41,6 +45,12 @@ async def lifespan(app: FastAPI):
     
     # 关闭时清理资源
     logger.info("关闭 News Mosaic 应用...")
+    # 先等待后台记忆写入结束，再关闭其依赖的连接；
+    # 智能助手模块（LangGraph、DashScope、jieba）按需加载，未加载过则不会有后台写入
+    if "services.news_agent_service" in sys.modules:
+        from services.news_agent_service import drain_background_tasks
+        await drain_background_tasks()
+    await news_service.close()
     await close_database()
     await close_redis()
     logger.info("应用已关闭")
@@ -53,6 +63,8 @@ app = FastAPI(
     version="1.0.0",
     docs_url="/docs",
     redoc_url="/redoc",
+    # 默认使用 orjson 序列化响应，对话历史、新闻列表等较大响应的序列化开销更低
+    default_response_class=ORJSONResponse,
     lifespan=lifespan
 )
 
@@ -122,12 +134,24 @@ async def root():
     }
 
 
+# 健康检查时间戳缓存：负载均衡高频探测时每秒最多格式化一次
+_health_timestamp_at = 0.0
+_health_timestamp = ""
+
+
 @app.get("/health")
 async def health_check():
     """健康检查端点"""
+    global _health_timestamp_at, _health_timestamp
+    
+    now = _monotonic()
+    if now - _health_timestamp_at >= 1.0:
+        _health_timestamp = datetime.now().isoformat()
+        _health_timestamp_at = now
+    
     return {
         "status": "健康",
-        "timestamp": logger.opt(record=True).info("健康检查")
+        "timestamp": _health_timestamp
     }
 
 
@@ -146,6 +170,10 @@ app.include_router(enhanced_chat_router, tags=["增强RAG对话"])
 from api.user_memory import router as user_memory_router
 app.include_router(user_memory_router, tags=["用户记忆管理"])
 
+# 导入并注册智能新闻助手API
+from api.news_agent import router as news_agent_router
+app.include_router(news_agent_router, tags=["智能新闻助手"])
+
 
 if __name__ == "__main__":
     uvicorn.run(
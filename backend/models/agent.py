@@ -2,7 +2,7 @@
 智能体模型定义
 """
 
-from typing import List, Dict, Any, Optional, TypedDict
+from typing import List, Dict, Any, Optional, TypedDict, Callable, Awaitable
 from pydantic import BaseModel, Field
 from models.user import UserPreferences
 
@@ -19,6 +19,9 @@ class AgentState(TypedDict):
     response_type: str  # 响应类型
     interest_operation: Optional[str]  # 兴趣操作类型
     interests_to_manage: List[str]  # 待管理兴趣关键词列表
+    current_user_message: Optional[str]  # 本轮用户输入
+    session_memory: Optional[Dict[str, Any]]  # 本轮开始时加载的会话记忆
+    token_callback: Optional[Callable[[str], Awaitable[None]]]  # 流式输出回调
 
 
 class AgentResponse(BaseModel):
@@ -35,7 +38,7 @@ class AgentResponse(BaseModel):
 
 class ChatMessage(BaseModel):
     """聊天消息模型"""
-    user_id: str = Field(..., description="用户ID")
+    user_id: Optional[str] = Field(None, description="用户ID（接口中以登录用户为准）")
     session_id: str = Field(..., description="会话ID")
     message: str = Field(..., description="消息内容")
     model_name: Optional[str] = Field(None, description="指定使用的AI模型名称")
@@ -1,38 +1,49 @@
 """
 服务模块
+
+子模块按需懒加载（PEP 562），避免导入任一服务时连带加载大模型 SDK。
 """
 
+import importlib
+
+# 与子模块同名的实例需立即导入：子模块一旦被导入，导入系统会把包属性设为子模块本身，
+# __getattr__ 不再被调用，"from services import news_service" 会拿到模块而非实例。
+# 这三个子模块只依赖 httpx，不涉及大模型 SDK，导入开销很小
 from .qwen_service import qwen_service
 from .news_service import news_service
 from .chat_service import chat_service
-from .news_agent_service import get_news_agent_service, NewsAgentService, get_available_models, get_default_model
-from .user_interest_service import (
-    add_user_interests,
-    remove_user_interests,
-    get_user_interests,
-    clear_user_interests,
-    query_related_interests,
-    get_user_interest_service
-)
-from .memory_mongo import SessionMemoryStore
-from .sentiment_service import SentimentService
-#from .embedding_service import embedding_service
-
-__all__ = [
-    "qwen_service",
-    "news_service", 
-    "chat_service",
-    "get_news_agent_service",
-    "NewsAgentService", 
-    "get_available_models",
-    "get_default_model",
-    "add_user_interests",
-    "remove_user_interests",
-    "get_user_interests", 
-    "clear_user_interests",
-    "query_related_interests",
-    "get_user_interest_service",
-    "SessionMemoryStore",
-    "SentimentService",
-    #"embedding_service"
-]
\ No newline at end of file
+
+# 导出名称 -> 所在子模块
+_EXPORTS = {
+    "get_news_agent_service": ".news_agent_service",
+    "NewsAgentService": ".news_agent_service",
+    "get_available_models": ".news_agent_service",
+    "get_default_model": ".news_agent_service",
+    "drain_background_tasks": ".news_agent_service",
+    "add_user_interests": ".user_interest_service",
+    "remove_user_interests": ".user_interest_service",
+    "get_user_interests": ".user_interest_service",
+    "clear_user_interests": ".user_interest_service",
+    "update_user_interests": ".user_interest_service",
+    "query_related_interests": ".user_interest_service",
+    "get_user_interest_service": ".user_interest_service",
+    "SessionMemoryStore": ".memory_mongo",
+    "session_memory_store": ".memory_mongo",
+    "SentimentService": ".sentiment_service",
+    #"embedding_service": ".embedding_service",
+}
+
+__all__ = ["qwen_service", "news_service", "chat_service"] + list(_EXPORTS)
+
+
+def __getattr__(name):
+    module_name = _EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
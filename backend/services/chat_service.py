@@ -53,6 +53,9 @@ class ChatService:
                 user_id
             )
             
+            # 获取聊天历史：写入本轮用户消息之前取最近10条（generate_response 会单独追加当前消息）
+            chat_history = self._messages.get(session.id, [])[-10:]
+            
             # 创建用户消息
             user_message = await self._create_message(
                 session_id=session.id,
@@ -62,9 +65,6 @@ class ChatService:
                 user_id=user_id
             )
             
-            # 获取聊天历史
-            chat_history = await self.get_session_messages(session.id, limit=10)
-            
             # 生成AI回复
             ai_response = await self.qwen_service.generate_response(
                 user_message=message_data.content,
@@ -243,25 +243,24 @@ class ChatService:
         if len(messages) < 2:
             return None
         
-        # 获取最后一条用户消息
-        last_user_message = None
-        for message in reversed(messages):
-            if message.role == MessageRole.USER:
-                last_user_message = message
-                break
-        
-        if not last_user_message:
+        # 从末尾定位最后一条用户消息（通常就是倒数第二条）
+        last_user_index = next(
+            (i for i in range(len(messages) - 1, -1, -1) if messages[i].role == MessageRole.USER),
+            None
+        )
+        if last_user_index is None:
             return None
+        last_user_message = messages[last_user_index]
         
         # 移除最后一条AI回复
-        if messages and messages[-1].role == MessageRole.ASSISTANT:
+        if messages[-1].role == MessageRole.ASSISTANT:
             messages.pop()
             session.message_count -= 1
         
-        # 生成新回复
+        # 生成新回复，历史只取该用户消息之前的最近10条，与 send_message 保持一致，不复制整个会话
         ai_response = await self.qwen_service.generate_response(
             user_message=last_user_message.content,
-            chat_history=messages[:-1],  # 排除当前用户消息
+            chat_history=messages[max(0, last_user_index - 10):last_user_index],
             temperature=temperature
         )
         
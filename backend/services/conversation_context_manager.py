@@ -4,6 +4,7 @@
 
 import uuid
 import asyncio
+import re
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Any, Tuple
 from loguru import logger
@@ -20,6 +21,10 @@ from services.embedding_service import QWenEmbeddingService
 class ConversationContextManager:
     """对话上下文管理器"""
     
+    # 推断用户兴趣的关键词，预编译为一条交替正则，一次扫描即可判断是否命中
+    _TECH_KEYWORDS_RE = re.compile("|".join(map(re.escape, ["AI", "人工智能", "技术", "科技", "算法", "编程"])))
+    _FINANCE_KEYWORDS_RE = re.compile("|".join(map(re.escape, ["经济", "财经", "股票", "投资", "金融", "市场"])))
+    
     def __init__(self):
         self.embedding_service = QWenEmbeddingService()
         
@@ -359,15 +364,12 @@ class ConversationContextManager:
         user_messages = [msg for msg in messages if msg.role == MessageRole.USER]
         
         # 简单的关键词匹配来推断用户兴趣
-        tech_keywords = ["AI", "人工智能", "技术", "科技", "算法", "编程"]
-        finance_keywords = ["经济", "财经", "股票", "投资", "金融", "市场"]
-        
         content_text = " ".join([msg.content for msg in user_messages])
         
-        if any(keyword in content_text for keyword in tech_keywords):
+        if self._TECH_KEYWORDS_RE.search(content_text):
             analysis["interested_categories"].append(InterestCategory.TECHNOLOGY)
         
-        if any(keyword in content_text for keyword in finance_keywords):
+        if self._FINANCE_KEYWORDS_RE.search(content_text):
             analysis["interested_categories"].append(InterestCategory.FINANCE)
         
         # 分析沟通风格
@@ -13,6 +13,9 @@ from models.sentiment import SentimentLabel, SentimentConfidence
 class DataMapperService:
     """数据映射服务 - 处理QWEN返回数据的格式转换"""
     
+    # 预编译的数字提取规则
+    _NUMBER_RE = re.compile(r'\d+')
+    
     def __init__(self):
         # 重要性级别映射
         self.importance_mapping = {
@@ -215,9 +218,9 @@ class DataMapperService:
         
         if isinstance(value, str):
             # 提取数字
-            numbers = re.findall(r'\d+', value)
-            if numbers:
-                return int(numbers[0])
+            number_match = self._NUMBER_RE.search(value)
+            if number_match:
+                return int(number_match.group())
         
         # 默认返回1分钟
         logger.warning(f"无法提取阅读时间: {value}，使用默认值 1")
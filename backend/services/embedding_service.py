@@ -271,22 +271,87 @@ class QWenEmbeddingService:
         if metadatas is None:
             metadatas = [{}] * len(texts)
         
-        # 并发处理所有文本
-        tasks = [
-            self.process_text(text, source_id, metadata)
-            for text, source_id, metadata in zip(texts, source_ids, metadatas)
+        # 1. 逐个文本分块，单个文本分块失败只影响该文本
+        chunk_lists = await asyncio.gather(
+            *[self.chunk_text(text, metadata) for text, metadata in zip(texts, metadatas)],
+            return_exceptions=True
+        )
+        
+        failed = set()
+        flat_chunks = []  # (文本下标, 分块)
+        for i, chunks in enumerate(chunk_lists):
+            if isinstance(chunks, Exception):
+                logger.error(f"文本 {source_ids[i]} 处理失败: {chunks}")
+                failed.add(i)
+                continue
+            flat_chunks.extend((i, chunk) for chunk in chunks)
+        
+        # 2. 所有文本的分块展平后按 batch_size 打包，跨文本填满每个批次，减少 API 调用次数
+        batches = [
+            flat_chunks[i:i + self.batch_size]
+            for i in range(0, len(flat_chunks), self.batch_size)
         ]
         
-        results = await asyncio.gather(*tasks, return_exceptions=True)
+        async def embed_batch(batch):
+            batch_start_time = time.time()
+            embeddings = await self.generate_embeddings_batch([chunk.content for _, chunk in batch])
+            return embeddings, time.time() - batch_start_time
         
-        # 处理异常
-        final_results = []
-        for i, result in enumerate(results):
-            if isinstance(result, Exception):
-                logger.error(f"文本 {source_ids[i]} 处理失败: {result}")
-                final_results.append([])
-            else:
-                final_results.append(result)
+        async def embed_batch_with_retry(batch):
+            """混合多个文本的批次失败时按文本拆分重试，使失败范围仅限于出错的文本"""
+            try:
+                return [(batch, await embed_batch(batch))]
+            except Exception as e:
+                groups: Dict[int, list] = {}
+                for item in batch:
+                    groups.setdefault(item[0], []).append(item)
+                if len(groups) == 1:
+                    return [(batch, e)]
+                
+                logger.warning(f"批次嵌入失败，按文本拆分重试 ({len(groups)} 个文本): {e}")
+                sub_batches = list(groups.values())
+                sub_results = await asyncio.gather(
+                    *[embed_batch(sub_batch) for sub_batch in sub_batches],
+                    return_exceptions=True
+                )
+                return list(zip(sub_batches, sub_results))
+        
+        retried_results = await asyncio.gather(
+            *[embed_batch_with_retry(batch) for batch in batches]
+        )
+        
+        # 3. 按文本下标将结果分发回各文本
+        final_results: List[List[EmbeddingResult]] = [[] for _ in texts]
+        for batch, batch_result in (pair for pairs in retried_results for pair in pairs):
+            if isinstance(batch_result, Exception):
+                batch_indexes = {i for i, _ in batch}
+                for i in batch_indexes:
+                    logger.error(f"文本 {source_ids[i]} 处理失败: {batch_result}")
+                failed.update(batch_indexes)
+                continue
+            
+            embeddings, batch_processing_time = batch_result
+            for (i, chunk), embedding in zip(batch, embeddings):
+                final_results[i].append(EmbeddingResult(
+                    chunk=chunk,
+                    embedding=embedding,
+                    model_info={
+                        "model": self.model_name,
+                        "version": "v3",
+                        "dimension": len(embedding),
+                        "source_id": source_ids[i]
+                    },
+                    processing_time=batch_processing_time / len(batch)
+                ))
+        
+        # 部分分块失败的文本整体视为失败，与逐文本处理时的行为一致（混合批次失败已按文本重试）
+        for i in failed:
+            final_results[i] = []
+        
+        logger.info(
+            f"批量文本处理完成: {len(texts)} 个文本, {len(flat_chunks)} 个分块, "
+            f"{len(batches)} 个批次"
+        )
         
         return final_results
     
@@ -4,19 +4,26 @@
 """
 
 import asyncio
+import heapq
 import time
+from time import monotonic as _monotonic
 import uuid
+from collections import OrderedDict
 from datetime import datetime, timedelta
-from typing import List, Dict, Any, Optional, Tuple
+from typing import List, Dict, Any, Optional, Tuple, AsyncIterator
 from dataclasses import dataclass
+from functools import partial
 from loguru import logger
 from pydantic import BaseModel, Field
 
+from core.config import settings
 from core.database import get_mongodb_database, Collections
+from core.cache import cache, CacheKeys
+from core.singleflight import SingleFlight, flight_key
 from services.qwen_service import QWENService
 from services.embedding_service import QWenEmbeddingService
 from services.vector_db_service import get_vector_db
-from services.news_service import NewsService
+from services.news_service import get_news_service
 from models.chat import ChatMessage, MessageRole, MessageType
 
 
@@ -75,9 +82,25 @@ class ConversationContext:
     metadata: Dict[str, Any]
 
 
+class _CachedConversation:
+    """对话缓存项：对话上下文及其过期时间"""
+    __slots__ = ("conversation", "expires_at")
+
+    def __init__(self, conversation: ConversationContext, expires_at: float):
+        self.conversation = conversation
+        self.expires_at = expires_at
+
+
 class EnhancedRAGChatService:
     """增强RAG对话服务"""
     
+    # 对话上下文缓存的过期时间（秒），过期后从数据库重新加载
+    CONVERSATION_CACHE_TTL = 1800
+    # 用户对话列表的 Redis 缓存过期时间（秒），对话更新或删除时主动失效
+    CONVERSATION_LIST_CACHE_TTL = 60
+    # 对话列表版本键的过期时间（秒），需远长于一次列表查询与缓存回填的耗时
+    CONVERSATION_LIST_VERSION_TTL = 86400
+    
     def __init__(self):
         self.qwen_service = None
         self.embedding_service = None
@@ -85,8 +108,12 @@ class EnhancedRAGChatService:
         self.news_service = None
         self.db = None
         
-        # 对话上下文缓存
-        self.conversation_cache: Dict[str, ConversationContext] = {}
+        # 对话上下文缓存；TTL 统一且每次写入/命中都续期并移到末尾，因此 OrderedDict 的链表顺序即过期顺序
+        # 过期时间使用单调时钟，不受系统时间调整影响；超出 CACHE_MAX_SIZE 时按 LRU 淘汰，防止大量会话撑满内存
+        self.conversation_cache: "OrderedDict[str, _CachedConversation]" = OrderedDict()
+        
+        # 进行中的检索与生成，相同请求并发到达时合并为一次执行
+        self._inflight = SingleFlight()
         
     async def _initialize_services(self):
         """初始化服务"""
@@ -94,7 +121,7 @@ class EnhancedRAGChatService:
             self.qwen_service = QWENService()
             self.embedding_service = QWenEmbeddingService()
             self.vector_db = get_vector_db()
-            self.news_service = NewsService()
+            self.news_service = await get_news_service()
             self.db = await get_mongodb_database()
     
     async def chat_with_rag(self, request: RAGChatRequest) -> RAGChatResponse:
@@ -106,11 +133,14 @@ class EnhancedRAGChatService:
         try:
             await self._initialize_services()
             
-            # 获取或创建会话
+            # 获取或创建会话，同时 1. 检索相关新闻（两者互不依赖，并发执行）
             session_id = request.session_id or str(uuid.uuid4())
-            conversation = await self._get_or_create_conversation(session_id, request.user_id)
+            conversation, relevant_news = await asyncio.gather(
+                self._get_or_create_conversation(session_id, request.user_id),
+                self._retrieve_relevant_news_shared(request)
+            )
             
-            # 添加用户消息到对话历史
+            # 用户消息在回复生成成功后才写入对话：生成失败时，缓存中的对话不会残留未保存的轮次
             user_message = ChatMessage(
                 session_id=session_id,
                 role=MessageRole.USER,
@@ -118,15 +148,6 @@ class EnhancedRAGChatService:
                 timestamp=datetime.utcnow(),
                 message_type=MessageType.TEXT
             )
-            conversation.messages.append(user_message)
-            
-            # 1. 检索相关新闻
-            relevant_news = await self._retrieve_relevant_news(
-                request.message,
-                request.max_context_news,
-                request.similarity_threshold,
-                request.user_id if request.enable_personalization else None
-            )
             
             # 2. 构建上下文
             context = await self._build_conversation_context(
@@ -137,13 +158,26 @@ class EnhancedRAGChatService:
             )
             
             # 3. 生成AI回复
-            ai_response = await self._generate_ai_response(
+            generate = partial(
+                self._generate_ai_response,
                 request.message,
                 context,
-                conversation.messages[-5:],  # 最近5条消息
+                (conversation.messages + [user_message])[-5:],  # 最近5条消息
                 request.temperature,
                 request.max_tokens
             )
+            # 新会话且未个性化时，回复只取决于问题与生成参数，相同问题的并发请求共用一次大模型调用
+            if (not request.use_user_memory and not request.enable_personalization
+                    and not conversation.messages):
+                ai_response = await self._inflight.do(
+                    flight_key(
+                        "answer", request.message, request.max_context_news,
+                        request.similarity_threshold, request.temperature, request.max_tokens
+                    ),
+                    generate
+                )
+            else:
+                ai_response = await generate()
             
             # 4. 添加AI回复到对话历史
             assistant_message = ChatMessage(
@@ -157,10 +191,10 @@ class EnhancedRAGChatService:
                     "sources_count": len(relevant_news)
                 }
             )
-            conversation.messages.append(assistant_message)
+            conversation.messages.extend([user_message, assistant_message])
             
             # 5. 更新对话上下文
-            await self._update_conversation(conversation)
+            await self._update_conversation(conversation, [user_message, assistant_message])
             
             # 6. 生成后续问题和相关话题
             follow_up_questions = await self._generate_follow_up_questions(
@@ -200,6 +234,133 @@ class EnhancedRAGChatService:
                 processing_time=time.time() - start_time
             )
     
+    async def chat_with_rag_stream(self, request: RAGChatRequest,
+                                   background_tasks=None) -> AsyncIterator[Dict[str, Any]]:
+        """
+        基于RAG的流式对话，逐段产出事件
+        
+        事件类型：
+        - meta: 会话ID与检索到的相关新闻（检索完成后立即发送）
+        - token: 模型增量输出
+        - done: 回复结束，附带令牌用量、后续问题与相关话题
+        - error: 对话失败
+        
+        Args:
+            request: RAG对话请求
+            background_tasks: 可选的 FastAPI BackgroundTasks；提供时对话写库在响应结束后执行
+        """
+        start_time = time.time()
+        session_id = request.session_id or str(uuid.uuid4())
+        
+        try:
+            await self._initialize_services()
+            
+            conversation, relevant_news = await asyncio.gather(
+                self._get_or_create_conversation(session_id, request.user_id),
+                self._retrieve_relevant_news_shared(request)
+            )
+            
+            yield {
+                "type": "meta",
+                "session_id": session_id,
+                "relevant_news": [self._format_news_for_response(news) for news in relevant_news]
+            }
+            
+            # 用户消息在回复完成后才写入对话：流中途失败或客户端断开时，缓存中的对话不会残留未保存的轮次
+            user_message = ChatMessage(
+                session_id=session_id,
+                role=MessageRole.USER,
+                content=request.message,
+                timestamp=datetime.utcnow(),
+                message_type=MessageType.TEXT
+            )
+            
+            context = await self._build_conversation_context(
+                conversation,
+                relevant_news,
+                request.use_user_memory,
+                request.user_id
+            )
+            messages = self._build_llm_messages(
+                request.message, context, (conversation.messages + [user_message])[-5:]
+            )
+            
+            # 边生成边下发，首字节时间只取决于大模型的预填充延迟
+            parts: List[str] = []
+            usage: Dict[str, Any] = {}
+            async for delta in self.qwen_service._stream_qwen_api(
+                messages, request.temperature, request.max_tokens, usage
+            ):
+                parts.append(delta)
+                yield {"type": "token", "content": delta}
+            
+            content = "".join(parts) or "抱歉，我无法生成回复。"
+            tokens_used = usage.get("total_tokens", 0)
+            
+            assistant_message = ChatMessage(
+                session_id=session_id,
+                role=MessageRole.ASSISTANT,
+                content=content,
+                timestamp=datetime.utcnow(),
+                message_type=MessageType.TEXT,
+                metadata={
+                    "tokens_used": tokens_used,
+                    "sources_count": len(relevant_news)
+                }
+            )
+            conversation.messages.extend([user_message, assistant_message])
+            
+            # 写库不阻塞流的结束
+            new_messages = [user_message, assistant_message]
+            if background_tasks is not None:
+                background_tasks.add_task(self._update_conversation, conversation, new_messages)
+            else:
+                await self._update_conversation(conversation, new_messages)
+            
+            follow_up_questions = await self._generate_follow_up_questions(
+                request.message, content, relevant_news
+            )
+            related_topics = await self._extract_related_topics(relevant_news)
+            
+            yield {
+                "type": "done",
+                "session_id": session_id,
+                "confidence_score": self._calculate_confidence_score(
+                    relevant_news, tokens_used, len(context)
+                ),
+                "tokens_used": tokens_used,
+                "sources_count": len(relevant_news),
+                "processing_time": time.time() - start_time,
+                "follow_up_questions": follow_up_questions,
+                "related_topics": related_topics
+            }
+            
+        except Exception as e:
+            logger.error(f"RAG流式对话失败: {e}")
+            yield {
+                "type": "error",
+                "session_id": session_id,
+                "message": f"对话失败: {str(e)}"
+            }
+    
+    async def _retrieve_relevant_news_shared(self, request: RAGChatRequest) -> List[Dict[str, Any]]:
+        """检索相关新闻；未启用个性化时相同查询的并发请求共用一次检索"""
+        user_id = request.user_id if request.enable_personalization else None
+        retrieve = partial(
+            self._retrieve_relevant_news,
+            request.message,
+            request.max_context_news,
+            request.similarity_threshold,
+            user_id
+        )
+        if user_id:
+            return await retrieve()
+        
+        return await self._inflight.do(
+            flight_key("news", request.message, request.max_context_news, request.similarity_threshold),
+            retrieve
+        )
+    
     async def _retrieve_relevant_news(self, query: str, max_results: int,
                                     threshold: float, user_id: Optional[str] = None) -> List[Dict[str, Any]]:
         """检索相关新闻"""
@@ -218,17 +379,24 @@ class EnhancedRAGChatService:
                 if user_id:
                     filtered_results = await self._personalize_results(filtered_results, user_id)
 
-                # 获取新闻详细信息
+                # 获取新闻详细信息：一次 $in 查询取回全部候选，再按检索排序组装
+                top_results = [r for r in filtered_results[:max_results] if r.get("news_id")]
+                news_by_id = {}
+                if top_results:
+                    cursor = self.db[Collections.NEWS].find(
+                        {"_id": {"$in": [r["news_id"] for r in top_results]}}
+                    )
+                    async for news in cursor:
+                        news_by_id[news["_id"]] = news
+
                 news_list = []
-                for result in filtered_results[:max_results]:
-                    news_id = result.get("news_id")
-                    if news_id:
-                        news = await self.db[Collections.NEWS].find_one({"_id": news_id})
-                        if news:
-                            # 确保similarity_score是Python原生float类型
-                            score = result.get("score", 0)
-                            news["similarity_score"] = float(score) if score is not None else 0.0
-                            news_list.append(news)
+                for result in top_results:
+                    news = news_by_id.get(result["news_id"])
+                    if news:
+                        # 确保similarity_score是Python原生float类型
+                        score = result.get("score", 0)
+                        news["similarity_score"] = float(score) if score is not None else 0.0
+                        news_list.append(news)
 
                 if news_list:
                     return news_list
@@ -288,6 +456,25 @@ class EnhancedRAGChatService:
                                   chat_history: List[ChatMessage], 
                                   temperature: float, max_tokens: int):
         """生成AI回复"""
+        messages = self._build_llm_messages(user_message, context, chat_history)
+        
+        # 调用QWEN API
+        api_response = await self.qwen_service._call_qwen_api(
+            messages, temperature, max_tokens
+        )
+
+        # 包装为QWENResponse对象
+        from services.qwen_service import QWENResponse
+        return QWENResponse(
+            content=api_response.get("content", "抱歉，我无法生成回复。"),
+            tokens_used=api_response.get("tokens_used", 0),
+            generation_time=0.0,
+            news_ids=[]
+        )
+
+    def _build_llm_messages(self, user_message: str, context: str,
+                            chat_history: List[ChatMessage]) -> List[Dict[str, str]]:
+        """构建发送给大模型的消息列表"""
         # 构建系统提示词
         system_prompt = """
         你是一个专业的新闻分析助手，基于提供的新闻信息回答用户问题。
@@ -324,34 +511,26 @@ class EnhancedRAGChatService:
         # 添加当前用户消息
         messages.append({"role": "user", "content": user_message})
         
-        # 调用QWEN API
-        api_response = await self.qwen_service._call_qwen_api(
-            messages, temperature, max_tokens
-        )
-
-        # 包装为QWENResponse对象
-        from services.qwen_service import QWENResponse
-        return QWENResponse(
-            content=api_response.get("content", "抱歉，我无法生成回复。"),
-            tokens_used=api_response.get("tokens_used", 0),
-            generation_time=0.0,
-            news_ids=[]
-        )
+        return messages
 
     async def _get_or_create_conversation(self, session_id: str, user_id: str) -> ConversationContext:
         """获取或创建对话上下文"""
         # 先从缓存中查找
-        if session_id in self.conversation_cache:
-            conversation = self.conversation_cache[session_id]
+        self._evict_expired_conversations()
+        cached = self.conversation_cache.get(session_id)
+        if cached is not None:
+            cached.expires_at = _monotonic() + self.CONVERSATION_CACHE_TTL
+            self.conversation_cache.move_to_end(session_id)
+            conversation = cached.conversation
             conversation.updated_at = datetime.utcnow()
             return conversation
 
         # 从数据库中查找
         try:
-            conversation_doc = await self.db[Collections.CONVERSATIONS].find_one({
-                "session_id": session_id,
-                "user_id": user_id
-            })
+            conversation_doc = await self.db[Collections.CONVERSATIONS].find_one(
+                {"session_id": session_id, "user_id": user_id},
+                {"_id": 0, "messages": 1, "created_at": 1, "metadata": 1}
+            )
 
             if conversation_doc:
                 # 重建对话对象
@@ -378,7 +557,7 @@ class EnhancedRAGChatService:
                 )
 
             # 添加到缓存
-            self.conversation_cache[session_id] = conversation
+            self._cache_conversation(conversation)
             return conversation
 
         except Exception as e:
@@ -393,30 +572,77 @@ class EnhancedRAGChatService:
                 metadata={}
             )
 
-    async def _update_conversation(self, conversation: ConversationContext):
-        """更新对话上下文"""
-        try:
-            conversation_doc = {
-                "session_id": conversation.session_id,
-                "user_id": conversation.user_id,
-                "messages": [msg.__dict__ for msg in conversation.messages],
-                "created_at": conversation.created_at,
-                "updated_at": conversation.updated_at,
-                "metadata": conversation.metadata
-            }
+    def _cache_conversation(self, conversation: ConversationContext):
+        """写入对话缓存，追加到链表末尾（即最晚过期的位置）"""
+        cache = self.conversation_cache
+        session_id = conversation.session_id
+        cache[session_id] = _CachedConversation(conversation, _monotonic() + self.CONVERSATION_CACHE_TTL)
+        cache.move_to_end(session_id)
+        if len(cache) > settings.CACHE_MAX_SIZE:
+            cache.popitem(last=False)
+
+    def _evict_expired_conversations(self):
+        """从链表头部弹出已到期项，遇到第一个未过期项即停止，开销只与过期数量相关"""
+        now = _monotonic()
+        cache = self.conversation_cache
+        while cache:
+            cached = cache[next(iter(cache))]
+            if cached.expires_at > now:
+                break
+            cache.popitem(last=False)
+
+    async def _update_conversation(self, conversation: ConversationContext, new_messages: List[ChatMessage]):
+        """
+        更新对话上下文
 
-            await self.db[Collections.CONVERSATIONS].replace_one(
+        Args:
+            conversation: 对话上下文
+            new_messages: 本轮新增的消息，只追加这些消息而不重写整个消息历史
+        """
+        try:
+            await self.db[Collections.CONVERSATIONS].update_one(
                 {"session_id": conversation.session_id, "user_id": conversation.user_id},
-                conversation_doc,
+                {
+                    "$push": {"messages": {"$each": [msg.__dict__ for msg in new_messages]}},
+                    "$set": {
+                        "updated_at": conversation.updated_at,
+                        "metadata": conversation.metadata
+                    },
+                    "$setOnInsert": {"created_at": conversation.created_at}
+                },
                 upsert=True
             )
 
-            # 更新缓存
-            self.conversation_cache[conversation.session_id] = conversation
+            # 更新缓存，并使该用户的对话列表缓存失效
+            self._cache_conversation(conversation)
+            await self.invalidate_conversation_list(conversation.user_id)
 
         except Exception as e:
             logger.error(f"更新对话上下文失败: {e}")
 
+    @staticmethod
+    def conversation_list_cache_key(user_id: str) -> str:
+        """
+        用户对话列表的缓存键（哈希，按数量限制分字段）
+        
+        v2：旧版本同名键为字符串类型，换用新键名避免滚动发布期间 HGET/HSET 报 WRONGTYPE；
+        用户ID作为 hash tag，保证与版本键位于同一集群槽位
+        """
+        return f"{CacheKeys.CHAT_HISTORY}{{{user_id}}}:conversations:v2"
+
+    @classmethod
+    def conversation_list_version_key(cls, user_id: str) -> str:
+        """用户对话列表的版本键，每次失效时递增"""
+        return f"{cls.conversation_list_cache_key(user_id)}:version"
+
+    async def invalidate_conversation_list(self, user_id: str) -> None:
+        """使用户对话列表缓存失效，并让失效前已开始的后台回填不再写入"""
+        await cache.invalidate_versioned(
+            self.conversation_list_cache_key(user_id),
+            self.conversation_list_version_key(user_id),
+            self.CONVERSATION_LIST_VERSION_TTL
+        )
+
     async def _get_user_context(self, user_id: str) -> Optional[str]:
         """获取用户上下文信息"""
         try:
@@ -430,7 +656,7 @@ class EnhancedRAGChatService:
                 return None
 
             # 获取最感兴趣的话题
-            top_interests = sorted(interests.items(), key=lambda x: x[1], reverse=True)[:5]
+            top_interests = heapq.nlargest(5, interests.items(), key=lambda x: x[1])
             interest_text = "、".join([interest for interest, _ in top_interests])
 
             return f"用户主要关注：{interest_text}"
@@ -448,11 +674,22 @@ class EnhancedRAGChatService:
 
             interests = user_prefs["interests"]
 
+            # 一次 $in 查询取回所有候选新闻的标题与正文，避免逐条查询
+            news_ids = [result["news_id"] for result in results if result.get("news_id")]
+            news_by_id = {}
+            if news_ids:
+                cursor = self.db[Collections.NEWS].find(
+                    {"_id": {"$in": news_ids}},
+                    projection={"title": 1, "content": 1}
+                )
+                async for news in cursor:
+                    news_by_id[news["_id"]] = news
+
             # 为每个结果计算个性化分数
             for result in results:
                 news_id = result.get("news_id")
                 if news_id:
-                    news = await self.db[Collections.NEWS].find_one({"_id": news_id})
+                    news = news_by_id.get(news_id)
                     if news:
                         # 简单的个性化评分：基于标题和内容中的关键词匹配
                         text = f"{news.get('title', '')} {news.get('content', '')}".lower()
@@ -3,21 +3,170 @@
 基于MongoDB的会话级记忆管理
 """
 
-from typing import Optional, Dict, Any
+from collections import OrderedDict
+from copy import deepcopy
+from typing import Optional, Dict, Any, Tuple
+from pymongo import WriteConcern
+from core.config import settings
 from core.database import get_mongodb_database
 import logging
 import asyncio
+import os
+from time import monotonic as _monotonic
 
 logger = logging.getLogger(__name__)
 
+# 同步接口在事件循环中派发的后台写入任务，保留引用避免任务被提前回收
+_background_tasks: set = set()
+
+
+def _running_loop() -> Optional[asyncio.AbstractEventLoop]:
+    """返回当前线程正在运行的事件循环，没有则返回None"""
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+
+
+def _spawn(coro) -> None:
+    """在正在运行的事件循环中后台执行协程，不阻塞调用方"""
+    task = asyncio.create_task(coro)
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
 class SessionMemoryStore:
     """会话级记忆存储：每个 session_id 独立存储记忆内容"""
 
+    # 会话记忆可由下一轮对话重建，写入只需主节点确认，不等待日志落盘与多数节点复制
+    WRITE_CONCERN = WriteConcern(w=1, j=False)
+
+    # 进程内记忆缓存：容量上限（LRU 淘汰）与有效期（秒）
+    # 缓存只在本进程内更新：多进程且无会话粘滞时，持有旧记忆的进程会用整份 $set 覆盖其他进程写入的对话，
+    # 因此多 worker 部署（WEB_CONCURRENCY > 1）时自动关闭，也可通过 SESSION_MEMORY_CACHE_ENABLED 关闭
+    CACHE_MAX_SIZE = 1024
+    CACHE_TTL = 300
+    # 按会话记录的最近写入序号数量上限，超出时淘汰最久未写入的会话
+    WRITE_SEQ_MAX_SIZE = 4096
+
     def __init__(self) -> None:
         """
         初始化会话记忆存储
         """
         self.collection_name = "session_memory"
+        self._db = None
+        self._collection = None
+        # session_id -> (过期时间, 记忆内容)；记忆为 None 表示数据库中不存在该会话
+        self._cache: "OrderedDict[str, Tuple[float, Optional[Dict[str, Any]]]]" = OrderedDict()
+        # 缓存统计：单线程事件循环内自增无竞争，用于调优 CACHE_TTL / CACHE_MAX_SIZE
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # 写入序号：每次保存/清除开始时递增，并记为该会话最近一次写入的序号；
+        # 数据库读取或写入期间该会话若有新的写入开始，其结果不再回填缓存，避免旧内容覆盖新内容
+        self._write_counter = 0
+        self._write_seqs: "OrderedDict[str, int]" = OrderedDict()
+        # 已淘汰会话中最大的写入序号，淘汰后的会话按此序号保守判断
+        self._evicted_write_seq = 0
+        # session_id -> 进行中写入完成时置位的 Future，读取数据库前先等待，避免读到写入前的旧记忆
+        self._pending_writes: Dict[str, asyncio.Future] = {}
+
+        workers = int(os.environ.get("WEB_CONCURRENCY", "1") or 1)
+        self.cache_enabled = settings.SESSION_MEMORY_CACHE_ENABLED and workers <= 1
+        if settings.SESSION_MEMORY_CACHE_ENABLED and not self.cache_enabled:
+            logger.warning("检测到 %s 个 worker，已关闭进程内会话记忆缓存", workers)
+
+    def _get_cached(self, session_id: str) -> Tuple[bool, Optional[Dict[str, Any]]]:
+        """查询进程内缓存，返回 (是否命中, 记忆内容的副本)，命中时刷新其 LRU 位置"""
+        if not self.cache_enabled:
+            return False, None
+        cache = self._cache
+        entry = cache.get(session_id)
+        if entry is None:
+            self.misses += 1
+            return False, None
+        if entry[0] <= _monotonic():
+            del cache[session_id]
+            self.misses += 1
+            return False, None
+        cache.move_to_end(session_id)
+        self.hits += 1
+        # 返回副本：调用方会原地修改记忆，不能影响缓存中已落库的内容
+        return True, deepcopy(entry[1])
+
+    def _set_cached(self, session_id: str, memory: Optional[Dict[str, Any]]) -> None:
+        """写入进程内缓存（保存副本），超出容量时淘汰最久未使用的会话"""
+        if not self.cache_enabled:
+            return
+        cache = self._cache
+        cache[session_id] = (_monotonic() + self.CACHE_TTL, deepcopy(memory))
+        cache.move_to_end(session_id)
+        if len(cache) > self.CACHE_MAX_SIZE:
+            cache.popitem(last=False)
+            self.evictions += 1
+
+    def _begin_write(self, session_id: str) -> int:
+        """登记一次写入的开始，返回本次写入的序号"""
+        self._write_counter += 1
+        seqs = self._write_seqs
+        seqs[session_id] = self._write_counter
+        seqs.move_to_end(session_id)
+        if len(seqs) > self.WRITE_SEQ_MAX_SIZE:
+            _, evicted_seq = seqs.popitem(last=False)
+            self._evicted_write_seq = max(self._evicted_write_seq, evicted_seq)
+        return self._write_counter
+
+    def _no_write_since(self, session_id: str, seq: int) -> bool:
+        """序号 seq 之后该会话是否没有新的写入开始"""
+        return self._write_seqs.get(session_id, self._evicted_write_seq) <= seq
+
+    def _track_write(self, session_id: str) -> asyncio.Future:
+        """登记进行中的写入，返回写入结束时需置位的 Future"""
+        done = asyncio.get_running_loop().create_future()
+        self._pending_writes[session_id] = done
+        return done
+
+    def _finish_write(self, session_id: str, done: asyncio.Future) -> None:
+        """写入结束：置位 Future，且仍是最近一次写入时移出进行中表"""
+        if not done.done():
+            done.set_result(None)
+        if self._pending_writes.get(session_id) is done:
+            del self._pending_writes[session_id]
+
+    async def _wait_pending_writes(self, session_id: str) -> None:
+        """等待该会话进行中的写入全部结束"""
+        pending = self._pending_writes.get(session_id)
+        while pending is not None:
+            # shield：读取方被取消时不影响写入方置位的 Future
+            await asyncio.shield(pending)
+            pending = self._pending_writes.get(session_id)
+
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """
+        获取进程内记忆缓存的统计信息
+
+        Returns:
+            Dict[str, Any]: 命中/未命中/淘汰次数、命中率及当前缓存大小
+        """
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._cache),
+            "max_size": self.CACHE_MAX_SIZE,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    async def _get_collection(self):
+        """获取记忆集合句柄，复用全局 MongoDB 连接，数据库实例不变时不重复创建"""
+        db = await get_mongodb_database()
+        if db is None:
+            logger.error("数据库连接失败")
+            return None
+        if db is not self._db:
+            self._db = db
+            self._collection = db.get_collection(self.collection_name, write_concern=self.WRITE_CONCERN)
+        return self._collection
 
     def get_memory(self, session_id: str) -> Optional[Dict[str, Any]]:
         """
@@ -30,21 +179,17 @@ class SessionMemoryStore:
             Optional[Dict[str, Any]]: 记忆内容，不存在则返回None
         """
         try:
-            # 尝试在当前事件循环中运行
-            loop = asyncio.get_event_loop()
-            if loop.is_running():
-                # 如果已经在异步环境中，创建一个任务
-                future = asyncio.create_task(self._get_memory_async(session_id))
-                # 注意：这里不能直接等待，返回None作为fallback
+            if _running_loop() is not None:
+                # 异步环境中无法同步等待结果，调用方应改用 get_memory_async
+                logger.warning("在事件循环中调用了同步 get_memory，请使用 get_memory_async")
                 return None
-            else:
-                # 如果不在异步环境中，创建新的事件循环
-                return asyncio.run(self._get_memory_async(session_id))
+            # 如果不在异步环境中，创建新的事件循环
+            return asyncio.run(self.get_memory_async(session_id))
         except Exception as e:
-            logger.error(f"获取会话记忆失败: {str(e)}")
+            logger.error("获取会话记忆失败: %s", e)
             return None
 
-    async def _get_memory_async(self, session_id: str) -> Optional[Dict[str, Any]]:
+    async def get_memory_async(self, session_id: str) -> Optional[Dict[str, Any]]:
         """
         获取指定会话的记忆内容（异步版本）
 
@@ -54,18 +199,29 @@ class SessionMemoryStore:
         Returns:
             Optional[Dict[str, Any]]: 记忆内容，不存在则返回None
         """
+        hit, memory = self._get_cached(session_id)
+        if hit:
+            return memory
+        
         try:
-            db = await get_mongodb_database()
-            if db is None:
-                logger.error("数据库连接失败")
+            # 上一轮的后台保存可能尚未完成，先等待，避免读到旧记忆
+            await self._wait_pending_writes(session_id)
+            
+            collection = await self._get_collection()
+            if collection is None:
                 return None
                 
-            collection = db[self.collection_name]
-            doc = await collection.find_one({"_id": session_id})
-            return doc["memory"] if doc and "memory" in doc else None
+            write_seq = self._write_counter
+            # 只取回 memory 字段，减少传输与解码的数据量
+            doc = await collection.find_one({"_id": session_id}, projection={"memory": 1, "_id": 0})
+            memory = doc.get("memory") if doc else None
+            # 不存在的会话也缓存，避免重复查询
+            if self._no_write_since(session_id, write_seq):
+                self._set_cached(session_id, memory)
+            return memory
             
         except Exception as e:
-            logger.error(f"获取会话记忆失败: {str(e)}")
+            logger.error("获取会话记忆失败: %s", e)
             return None
 
     def save_memory(self, session_id: str, memory: Dict[str, Any]) -> None:
@@ -77,18 +233,16 @@ class SessionMemoryStore:
             memory: 记忆内容
         """
         try:
-            # 尝试在当前事件循环中运行
-            loop = asyncio.get_event_loop()
-            if loop.is_running():
-                # 如果已经在异步环境中，创建一个任务
-                asyncio.create_task(self._save_memory_async(session_id, memory))
+            if _running_loop() is not None:
+                # 如果已经在异步环境中，后台写入，不阻塞事件循环
+                _spawn(self.save_memory_async(session_id, memory))
             else:
-                # 如果不在异 asynchronous 环境中，创建新的事件循环
-                asyncio.run(self._save_memory_async(session_id, memory))
+                # 如果不在异步环境中，创建新的事件循环
+                asyncio.run(self.save_memory_async(session_id, memory))
         except Exception as e:
-            logger.error(f"保存会话记忆失败: {str(e)}")
+            logger.error("保存会话记忆失败: %s", e)
     
-    async def _save_memory_async(self, session_id: str, memory: Dict[str, Any]) -> None:
+    async def save_memory_async(self, session_id: str, memory: Dict[str, Any]) -> None:
         """
         保存/更新指定会话的记忆内容（异步版本）
 
@@ -96,21 +250,27 @@ class SessionMemoryStore:
             session_id: 会话ID
             memory: 记忆内容
         """
+        # 写入期间先移除旧缓存，读取等待写入结束后回落到数据库；写入成功后才缓存新记忆，失败时不会提供未落库的内容
+        self._cache.pop(session_id, None)
+        write_seq = self._begin_write(session_id)
+        done = self._track_write(session_id)
         try:
-            db = await get_mongodb_database()
-            if db is None:
-                logger.error("数据库连接失败")
+            collection = await self._get_collection()
+            if collection is None:
                 return
                 
-            collection = db[self.collection_name]
             await collection.update_one(
                 {"_id": session_id},
                 {"$set": {"memory": memory}},
                 upsert=True
             )
+            if self._no_write_since(session_id, write_seq):
+                self._set_cached(session_id, memory)
             
         except Exception as e:
-            logger.error(f"保存会话记忆失败: {str(e)}")
+            logger.error("保存会话记忆失败: %s", e)
+        finally:
+            self._finish_write(session_id, done)
 
     def clear_memory(self, session_id: str) -> None:
         """
@@ -120,32 +280,39 @@ class SessionMemoryStore:
             session_id: 会话ID
         """
         try:
-            # 尝试在当前事件循环中运行
-            loop = asyncio.get_event_loop()
-            if loop.is_running():
-                # 如果已经在异步环境中，创建一个任务
-                asyncio.create_task(self._clear_memory_async(session_id))
+            if _running_loop() is not None:
+                # 如果已经在异步环境中，后台清除，不阻塞事件循环
+                _spawn(self.clear_memory_async(session_id))
             else:
                 # 如果不在异步环境中，创建新的事件循环
-                asyncio.run(self._clear_memory_async(session_id))
+                asyncio.run(self.clear_memory_async(session_id))
         except Exception as e:
-            logger.error(f"清除会话记忆失败: {str(e)}")
+            logger.error("清除会话记忆失败: %s", e)
     
-    async def _clear_memory_async(self, session_id: str) -> None:
+    async def clear_memory_async(self, session_id: str) -> None:
         """
         清除指定会话的记忆（异步版本）
 
         Args:
             session_id: 会话ID
         """
+        self._cache.pop(session_id, None)
+        write_seq = self._begin_write(session_id)
+        done = self._track_write(session_id)
         try:
-            db = await get_mongodb_database()
-            if db is None:
-                logger.error("数据库连接失败")
+            collection = await self._get_collection()
+            if collection is None:
                 return
                 
-            collection = db[self.collection_name]
             await collection.delete_one({"_id": session_id})
+            if self._no_write_since(session_id, write_seq):
+                self._set_cached(session_id, None)
             
         except Exception as e:
-            logger.error(f"清除会话记忆失败: {str(e)}")
\ No newline at end of file
+            logger.error("清除会话记忆失败: %s", e)
+        finally:
+            self._finish_write(session_id, done)
+
+
+# 进程内共享的会话记忆存储实例
+session_memory_store = SessionMemoryStore()
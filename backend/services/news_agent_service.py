@@ -2,28 +2,114 @@
 智能新闻助手服务 - 基于 LangGraph 的智能新闻搜索系统
 """
 
+import asyncio
 import logging
-from typing import List, Dict, Any, Optional
+import re
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional, AsyncIterator, Awaitable, Callable, Tuple
 from datetime import datetime
 
+import jieba
+import jieba.posseg as pseg
 from langchain_community.chat_models import ChatTongyi
 from langchain_core.messages import HumanMessage, SystemMessage, AIMessage
+from langchain_core.runnables import RunnableConfig
 from langgraph.graph import StateGraph, END
 
 from core.config import settings
+from core.llm_limiter import llm_semaphore
 from services.news_service import get_news_service
-from services.memory_mongo import SessionMemoryStore
-from services.user_interest_service import add_user_interests, remove_user_interests, get_user_interests, clear_user_interests, query_related_interests
+from services.memory_mongo import session_memory_store
+from services.user_interest_service import add_user_interests, get_user_interests, update_user_interests, query_related_interests
 from models.news import NewsSearchRequest
 from models.agent import AgentState
 
 logger = logging.getLogger(__name__)
 
-# 全局缓存，用于存储已创建的智能体服务实例
-_agent_service_cache = {}
-
 # 全局服务实例缓存
 _news_agent_services: Dict[str, "NewsAgentService"] = {}
+_news_agent_services_lock = asyncio.Lock()
+
+# 后台写入任务引用，防止未完成的任务被垃圾回收
+_background_tasks: set = set()
+
+# 意图分类结果缓存（按归一化后的消息文本，LRU 淘汰）
+_INTENT_CACHE_MAX_SIZE = 4096
+_intent_cache: "OrderedDict[str, str]" = OrderedDict()
+_WHITESPACE_PATTERN = re.compile(r"\s+")
+
+
+def _normalize_message(message: str) -> str:
+    """归一化用户消息，作为意图缓存的键"""
+    return _WHITESPACE_PATTERN.sub(" ", message.strip().lower())
+
+
+def _get_cached_intent(normalized_text: str) -> Optional[str]:
+    """查询意图缓存，命中时刷新其 LRU 位置"""
+    intent = _intent_cache.get(normalized_text)
+    if intent is not None:
+        _intent_cache.move_to_end(normalized_text)
+    return intent
+
+
+def _cache_intent(normalized_text: str, intent: str) -> None:
+    """写入意图缓存，超出容量时淘汰最久未使用的条目"""
+    _intent_cache[normalized_text] = intent
+    _intent_cache.move_to_end(normalized_text)
+    if len(_intent_cache) > _INTENT_CACHE_MAX_SIZE:
+        _intent_cache.popitem(last=False)
+
+
+# 会话历史消息对象缓存：session_id -> (最后一轮的时间戳, 已构建的消息列表)
+_HISTORY_TURNS = 5
+_HISTORY_CACHE_MAX_SIZE = 1024
+_history_messages_cache: "OrderedDict[str, Tuple[Optional[str], List]]" = OrderedDict()
+
+
+def _build_history_messages(history: List[Dict[str, Any]]) -> List:
+    """将最近几轮历史记录构建为消息对象"""
+    messages = []
+    for history_item in history[-_HISTORY_TURNS:]:
+        messages.append(HumanMessage(content=history_item["user"]))
+        messages.append(AIMessage(content=history_item["assistant"]))
+    return messages
+
+
+def _get_history_messages(session_id: str, history: List[Dict[str, Any]]) -> List:
+    """获取会话历史消息，最后一轮时间戳一致时复用已构建的消息对象"""
+    last_timestamp = history[-1].get("timestamp") if history else None
+    cached = _history_messages_cache.get(session_id)
+    if cached is not None and cached[0] == last_timestamp:
+        _history_messages_cache.move_to_end(session_id)
+        return list(cached[1])
+    
+    messages = _build_history_messages(history)
+    _store_history_messages(session_id, last_timestamp, messages)
+    return list(messages)
+
+
+def _append_history_messages(session_id: str, history: List[Dict[str, Any]]) -> None:
+    """新一轮对话写入历史后，增量更新消息对象缓存"""
+    new_turn = history[-1]
+    previous_timestamp = history[-2].get("timestamp") if len(history) > 1 else None
+    cached = _history_messages_cache.get(session_id)
+    if cached is not None and cached[0] == previous_timestamp:
+        messages = cached[1] + [
+            HumanMessage(content=new_turn["user"]),
+            AIMessage(content=new_turn["assistant"])
+        ]
+        messages = messages[-2 * _HISTORY_TURNS:]
+    else:
+        messages = _build_history_messages(history)
+    _store_history_messages(session_id, new_turn.get("timestamp"), messages)
+
+
+def _store_history_messages(session_id: str, last_timestamp: Optional[str], messages: List) -> None:
+    """写入消息对象缓存，超出容量时淘汰最久未使用的会话"""
+    _history_messages_cache[session_id] = (last_timestamp, messages)
+    _history_messages_cache.move_to_end(session_id)
+    if len(_history_messages_cache) > _HISTORY_CACHE_MAX_SIZE:
+        _history_messages_cache.popitem(last=False)
 
 # 获取可用的AI模型列表
 def get_available_models() -> List[str]:
@@ -58,16 +144,54 @@ async def get_news_agent_service(model_name: str = None) -> "NewsAgentService":
     # 确定使用的模型名称
     effective_model = model_name or get_default_model()
     
-    # 如果该模型的服务实例不存在，则创建
-    if effective_model not in _news_agent_services:
-        _news_agent_services[effective_model] = NewsAgentService(effective_model)
+    # 已创建时直接返回，无需加锁
+    service = _news_agent_services.get(effective_model)
+    if service is not None:
+        return service
+    
+    # 并发冷启动时只创建一个实例
+    async with _news_agent_services_lock:
+        if effective_model not in _news_agent_services:
+            # 预先加载分词词典，避免首次提取关键词时加载；词典加载耗时较长，放到线程中执行，不阻塞事件循环
+            await asyncio.to_thread(jieba.initialize)
+            _news_agent_services[effective_model] = NewsAgentService(effective_model)
     
     return _news_agent_services[effective_model]
 
 
+async def drain_background_tasks(timeout: float = 5.0) -> None:
+    """应用关闭时等待后台记忆写入完成，超时未完成的任务取消并等待其退出
+    
+    Args:
+        timeout: 等待后台任务完成的最长时间（秒）
+    """
+    if not _background_tasks:
+        return
+    
+    _, pending = await asyncio.wait(set(_background_tasks), timeout=timeout)
+    for task in pending:
+        task.cancel()
+    if pending:
+        await asyncio.gather(*pending, return_exceptions=True)
+        logger.warning("关闭时取消了 %s 个未完成的记忆写入任务", len(pending))
+
+
+def _agent_node(method_name: str):
+    """将 NewsAgentService 的节点方法包装为与实例无关的图节点，运行时从 config 中取出服务实例"""
+    async def node(state: AgentState, config: RunnableConfig) -> AgentState:
+        agent = config["configurable"]["agent"]
+        return await getattr(agent, method_name)(state)
+    
+    node.__name__ = method_name
+    return node
+
+
 class NewsAgentService:
     """智能新闻助手 - 专注新闻搜索和兴趣管理"""
     
+    # 编译后的工作流，与实例无关，模块导入时构建一次（见文件末尾）
+    _COMPILED_GRAPH = None
+    
     # 分类系统提示词
     CLASSIFY_PROMPT = """
 你是一名智能的新闻搜索助手，接下来用户会发送一个输入，你需要判断这个输入属于以下四类中的哪一类。你的任务是理解语义并准确分类，而不是简单地匹配句式或关键词。请注意用户输入可能含糊不清，你需要尽可能地做出合理判断。
@@ -120,6 +244,37 @@ class NewsAgentService:
 其它
 """
     
+    # 意图快速路由规则：明显的请求直接判定，不调用 LLM
+    # 兴趣调整只匹配明确的兴趣管理句式；仅提到"订阅""偏好"等词的新闻请求交给分类器
+    FAST_ROUTE_PATTERNS = [
+        (re.compile(r"^我(现在|最近)?(都|也|还)?(对|想看看我对)[^，,。；;]{0,12}感兴趣[了吧呢啊]?[?？!！。.]*$"), "兴趣调整"),
+        (re.compile(r"(添加|增加|删除|移除|取消)(我的)?(兴趣|订阅|关注)"), "兴趣调整"),
+        (re.compile(r"^(查看|看看)我的(兴趣|订阅|偏好)[?？!！。.]*$"), "兴趣调整"),
+        (re.compile(r"^(最近|今天|今日|现在)?(有(什么|啥)|给我推荐(点|一些)?|推荐(点|一些)?)(新闻|热点|新鲜事)(吗|呢)?[?？!！。.]*$"), "含糊搜索"),
+        (re.compile(r"^(最近|今天|今日|现在)?(的)?(新闻|热点)(有哪些|有什么)[?？!！。.]*$"), "含糊搜索"),
+    ]
+
+    # 分类时只需输出一个标签，限制生成长度以减少解码耗时
+    CLASSIFY_MAX_TOKENS = 8
+
+    # 关键词快速提取：短消息分词去停用词后直接作为关键词，不调用 LLM
+    FAST_KEYWORDS_MAX_MESSAGE_LENGTH = 12
+    KEYWORD_STOPWORDS = {
+        "新闻", "最近", "近期", "什么", "有", "有没有", "给", "我", "看", "想", "要", "的", "了",
+        "吗", "呢", "吧", "啊", "和", "与", "及", "一些", "一下", "点", "关于", "相关", "消息",
+        "资讯", "报道", "动态", "推荐", "搜索", "找", "帮", "请", "怎么样", "如何", "这个", "那个",
+    }
+    # 可作为关键词的词性：普通名词、人名、地名、机构名、其他专名、英文
+    KEYWORD_POS_TAGS = {"n", "nr", "nrt", "nrfg", "ns", "nt", "nz", "eng"}
+    # 被分词器标为名词、实为疑问或口语谓词的词，出现时交由 LLM 理解句意
+    KEYWORD_NON_TOPIC_NOUNS = {"干嘛", "干啥", "咋样"}
+    TIME_WORD_PERIODS = {
+        "今天": "1d", "今日": "1d", "当天": "1d", "昨天": "1d", "昨日": "1d",
+        "本周": "1w", "这周": "1w", "上周": "1w",
+        "本月": "1m", "上月": "1m",
+        "今年": "1y", "本年": "1y", "去年": "1y",
+    }
+
     # 关键词提取提示词
     EXTRACT_KEYWORDS_PROMPT = """
 你是一个关键词提取助手，任务是从用户的输入中识别出与"新闻主题"相关的关键词。
@@ -188,6 +343,7 @@ class NewsAgentService:
 3. **两阶段处理**：复杂需求分解为查询+操作两个阶段
 4. 关键词必须从用户输入中真实提取，不要臆造
 5. 每个操作独占一行
+6. **替换检测**：当用户说"换成"、"改成"、"替换"时，必须在同一行输出 REPLACE:旧兴趣|新兴趣，不要拆成多步或留空新兴趣
 
 **示例分析：**
 
@@ -349,6 +505,33 @@ ADD:娱乐
 
 请分析以下用户输入并提取时间信息："""
 
+    # 智能对话系统提示词
+    OTHER_CHAT_PROMPT = """你是一个专业的智能新闻助手，名字叫"新闻小助手"。
+
+你的核心功能：
+1. 新闻搜索：帮助用户搜索和获取各类新闻资讯
+2. 兴趣管理：管理用户的新闻偏好和兴趣标签
+
+当用户进行非新闻相关的对话时，请：
+- 保持友好和专业的态度
+- 简洁回应用户的问题或闲聊
+- 适时自然地引导用户了解你的新闻功能
+- 不要生硬地推销功能，要让对话感觉自然
+
+回复风格：
+- 简洁明了，不要过长
+- 语气友好亲切
+- 可以适当使用emoji增加亲和力
+
+示例：
+用户说"你好"时，可以回复："你好！我是新闻小助手😊 有什么新闻想了解的吗？"
+用户问"今天天气怎么样"时，可以回复："我主要专注新闻资讯哦，不过可以帮你搜索今天的天气新闻！"
+"""
+
+    # 智能对话生成超时时间（秒）及备用回复
+    OTHER_CHAT_TIMEOUT = 15
+    OTHER_CHAT_FALLBACK_REPLY = "你好！我是新闻小助手，有什么新闻想了解的吗？ 😊"
+
     def __init__(self, model_name: str = None) -> None:
         """初始化智能体服务
         
@@ -369,22 +552,37 @@ ADD:娱乐
             model=self.model_name, 
             dashscope_api_key=settings.DASHSCOPE_API_KEY
         )
-        self.memory_store = SessionMemoryStore()
-        self.graph = self._build_graph()
+        self.memory_store = session_memory_store
+        
+        # 预先构建系统提示词消息，各节点直接复用
+        self._sys_classify = SystemMessage(content=self.CLASSIFY_PROMPT)
+        self._sys_keywords_time = SystemMessage(content=self.KEYWORDS_TIME_EXTRACT_PROMPT)
+        self._sys_general_keywords = SystemMessage(content=self.GENERAL_KEYWORDS_PROMPT)
+        self._sys_time_extract = SystemMessage(content=self.TIME_EXTRACT_PROMPT)
+        self._sys_interest_intent = SystemMessage(content=self.INTEREST_INTENT_PROMPT)
+        self._sys_other_chat = SystemMessage(content=self.OTHER_CHAT_PROMPT)
+        
+        self.graph = type(self)._COMPILED_GRAPH
         logger.info(f"智能新闻助手服务初始化完成，使用模型: {self.model_name}")
     
-    def _build_graph(self) -> StateGraph:
-        """构建 LangGraph 工作流，手动管理记忆，入口为 classify_intent"""
+    @classmethod
+    def _build_graph(cls) -> StateGraph:
+        """构建 LangGraph 工作流，手动管理记忆，入口为 classify_intent
+        
+        节点通过 config["configurable"]["agent"] 获取服务实例，编译结果可在所有实例间共享。
+        """
         workflow = StateGraph(AgentState)
 
         # 添加节点
-        workflow.add_node("classify_intent", self._classify_intent)
-        workflow.add_node("extract_keywords", self._extract_keywords)
-        workflow.add_node("search_precise", self._search_precise)
-        workflow.add_node("search_general", self._search_general)
-        workflow.add_node("manage_interests", self._manage_interests)
-        workflow.add_node("handle_other", self._handle_other)
-        workflow.add_node("save_memory", self._save_memory)
+        workflow.add_node("classify_intent", _agent_node("_classify_intent"))
+        workflow.add_node("extract_keywords", _agent_node("_extract_keywords"))
+        workflow.add_node("add_interest", _agent_node("_add_interest"))
+        workflow.add_node("search_news", _agent_node("_search_news"))
+        workflow.add_node("format_search_reply", _agent_node("_format_search_reply"))
+        workflow.add_node("search_general", _agent_node("_search_general"))
+        workflow.add_node("manage_interests", _agent_node("_manage_interests"))
+        workflow.add_node("handle_other", _agent_node("_handle_other"))
+        workflow.add_node("save_memory", _agent_node("_save_memory"))
 
         # 入口点
         workflow.set_entry_point("classify_intent")
@@ -392,7 +590,7 @@ ADD:娱乐
         # 分类后的条件路由
         workflow.add_conditional_edges(
             "classify_intent",
-            self._route_by_intent,
+            cls._route_by_intent,
             {
                 "准确搜索": "extract_keywords",
                 "含糊搜索": "search_general",
@@ -401,9 +599,11 @@ ADD:娱乐
             }
         )
 
-        # 准确搜索流程
-        workflow.add_edge("extract_keywords", "search_precise")
-        workflow.add_edge("search_precise", "save_memory")
+        # 准确搜索流程：兴趣更新与新闻搜索互不依赖，并行执行后汇合
+        workflow.add_edge("extract_keywords", "add_interest")
+        workflow.add_edge("extract_keywords", "search_news")
+        workflow.add_edge(["add_interest", "search_news"], "format_search_reply")
+        workflow.add_edge("format_search_reply", "save_memory")
 
         # 含糊搜索流程
         workflow.add_edge("search_general", "save_memory")
@@ -420,27 +620,69 @@ ADD:娱乐
         # 不使用 checkpointer，而是手动管理记忆
         return workflow.compile()
     
-    async def process_user_message(self, user_id: str, session_id: str, message: str) -> Dict[str, Any]:
-        """处理用户消息的主入口"""
+    async def stream_user_message(self, user_id: str, session_id: str, message: str) -> AsyncIterator[Dict[str, Any]]:
+        """流式处理用户消息
+        
+        先逐段产出 {"event": "token", "data": 文本片段}，
+        最后产出 {"event": "done", "data": 完整结果}，结果结构与 process_user_message 相同。
+        """
+        queue: asyncio.Queue = asyncio.Queue()
+        
+        async def on_token(token: str) -> None:
+            await queue.put({"event": "token", "data": token})
+        
+        async def run() -> None:
+            try:
+                result = await self.process_user_message(user_id, session_id, message, on_token=on_token)
+                await queue.put({"event": "done", "data": result})
+            finally:
+                await queue.put(None)
+        
+        task = asyncio.create_task(run())
         try:
-            print(f"🔍 [智能体] 处理消息: {message}")
+            while True:
+                item = await queue.get()
+                if item is None:
+                    break
+                yield item
+        finally:
+            if not task.done():
+                task.cancel()
+    
+    async def process_user_message(
+        self,
+        user_id: str,
+        session_id: str,
+        message: str,
+        on_token: Optional[Callable[[str], Awaitable[None]]] = None
+    ) -> Dict[str, Any]:
+        """处理用户消息的主入口
+        
+        Args:
+            user_id: 用户ID
+            session_id: 会话ID
+            message: 用户消息
+            on_token: 可选的流式回调，智能对话回复生成时逐段调用
+        """
+        try:
+            logger.debug("[智能体] 处理消息: %s", message)
             logger.info(f"处理用户消息 [用户: {user_id}, 会话: {session_id}]: {message}")
 
-            # 加载历史记忆
-            memory = self.memory_store.get_memory(session_id) or {
+            # 加载历史记忆与识别本轮意图互不依赖，并发执行
+            memory, intent = await asyncio.gather(
+                self.memory_store.get_memory_async(session_id),
+                self._detect_intent(message)
+            )
+            memory = memory or {
                 "conversation_history": [],
                 "user_context": {}
             }
             
-            # 构建包含历史记忆的消息列表
-            messages = []
-            recent_history = memory.get("conversation_history", [])[-5:]
-            for history_item in recent_history:
-                messages.append(HumanMessage(content=history_item["user"]))
-                messages.append(AIMessage(content=history_item["assistant"]))
+            # 构建包含历史记忆的消息列表（复用已缓存的历史消息对象）
+            messages = _get_history_messages(session_id, memory.get("conversation_history", []))
             messages.append(HumanMessage(content=message))
             
-            print(f"📚 [记忆] 历史对话: {len(recent_history)} 轮")
+            logger.debug("[记忆] 历史对话: %s 轮", (len(messages) - 1) // 2)
 
             # 初始化状态并运行工作流
             initial_state = AgentState(
@@ -450,14 +692,20 @@ ADD:娱乐
                 user_preferences=None,
                 extracted_keywords=[],
                 search_result=None,
-                response_type="",
+                response_type=intent,
                 interest_operation=None,
-                interests_to_manage=[]
+                interests_to_manage=[],
+                current_user_message=message,
+                session_memory=memory,
+                token_callback=on_token
             )
 
-            print(f"🚀 [工作流] 开始执行")
-            final_state = await self.graph.ainvoke(initial_state)
-            print(f"✅ [工作流] 执行完成")
+            logger.debug("[工作流] 开始执行")
+            final_state = await self.graph.ainvoke(
+                initial_state,
+                config={"configurable": {"agent": self}}
+            )
+            logger.debug("[工作流] 执行完成")
 
             # 提取智能体回复并构建结果
             last_message = final_state["messages"][-1]
@@ -471,17 +719,17 @@ ADD:娱乐
             }
             
             # 输出结果摘要
-            print(f"📤 [结果] 类型: {result['type']}")
-            if result['keywords_used']:
-                print(f"    关键词: {', '.join(result['keywords_used'])}")
-            if result['search_result'] and result['search_result'].get('success'):
-                sr = result['search_result']
-                print(f"    搜索: 找到{sr.get('total_found', 0)}篇，保存{sr.get('saved_count', 0)}篇")
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("[结果] 类型: %s", result['type'])
+                if result['keywords_used']:
+                    logger.debug("    关键词: %s", ', '.join(result['keywords_used']))
+                if result['search_result'] and result['search_result'].get('success'):
+                    sr = result['search_result']
+                    logger.debug("    搜索: 找到%s篇，保存%s篇", sr.get('total_found', 0), sr.get('saved_count', 0))
             
             return result
 
         except Exception as e:
-            print(f"❌ [错误] 智能体处理失败: {str(e)}")
             logger.error(f"处理用户消息失败: {str(e)}")
             return {
                 "reply": "抱歉，处理您的请求时遇到了问题，请稍后重试。",
@@ -490,57 +738,99 @@ ADD:娱乐
             }
     
     async def _classify_intent(self, state: AgentState) -> AgentState:
-        """分类用户意图"""
-        user_message = state["messages"][-1].content
-        print(f"🎯 [分类] 分析用户意图: {user_message}")
+        """分类用户意图（入口已与记忆加载并发完成分类时直接沿用）"""
+        if not state.get("response_type"):
+            state["response_type"] = await self._detect_intent(state["messages"][-1].content)
+        return state
+    
+    async def _detect_intent(self, user_message: str) -> str:
+        """识别用户意图，只依赖本轮消息，可与历史记忆加载并发执行"""
+        logger.debug("[分类] 分析用户意图: %s", user_message)
+        
+        # 相同（归一化后）的消息直接复用之前的分类结果
+        normalized_message = _normalize_message(user_message)
+        cached_intent = _get_cached_intent(normalized_message)
+        if cached_intent is not None:
+            logger.debug("[分类] 命中缓存: %s", cached_intent)
+            return cached_intent
+        
+        # 明显的请求通过规则直接路由
+        fast_intent = self._fast_route(normalized_message)
+        if fast_intent is not None:
+            _cache_intent(normalized_message, fast_intent)
+            logger.debug("[分类] 规则路由: %s", fast_intent)
+            return fast_intent
         
         try:
             messages = [
-                SystemMessage(content=self.CLASSIFY_PROMPT),
+                self._sys_classify,
                 HumanMessage(content=user_message)
             ]
             
-            response = await self.llm.ainvoke(messages)
+            response = await self._ainvoke(messages, max_tokens=self.CLASSIFY_MAX_TOKENS)
             classification = response.content.strip()
-            print(f"🤖 [分类] AI结果: {classification}")
+            logger.debug("[分类] AI结果: %s", classification)
             
             # 验证分类结果
             valid_types = ["准确搜索", "含糊搜索", "兴趣调整", "其它"]
             if classification in valid_types:
-                state["response_type"] = classification
+                _cache_intent(normalized_message, classification)
                 logger.info(f"意图分类成功: {classification}")
-            else:
-                state["response_type"] = "其它"
-                print(f"⚠️ [分类] 无效结果，默认为: 其它")
-                logger.warning(f"意图分类无效: {classification}，默认为其它")
+                return classification
+            
+            logger.warning(f"意图分类无效: {classification}，默认为其它")
                 
         except Exception as e:
             logger.error(f"意图分类失败: {str(e)}")
-            state["response_type"] = "其它"
-            print(f"❌ [分类] 异常，默认为: 其它")
         
-        return state
+        return "其它"
+    
+    async def _ainvoke(self, messages: List, **kwargs) -> Any:
+        """调用 LLM，所有实例共享并发上限，避免突发流量触发上游限流
+        
+        Args:
+            messages: 消息列表
+            **kwargs: 额外的模型调用参数（如 max_tokens）
+        """
+        llm = self.llm.bind(**kwargs) if kwargs else self.llm
+        async with llm_semaphore:
+            return await llm.ainvoke(messages)
+    
+    def _fast_route(self, message: str) -> Optional[str]:
+        """基于关键词规则快速判定意图，无法确定时返回 None"""
+        for pattern, intent in self.FAST_ROUTE_PATTERNS:
+            if pattern.search(message):
+                return intent
+        return None
     
-    def _route_by_intent(self, state: AgentState) -> str:
+    @staticmethod
+    def _route_by_intent(state: AgentState) -> str:
         """根据意图路由"""
         route = state["response_type"]
-        print(f"🔀 [路由] 跳转到: {route}")
+        logger.debug("[路由] 跳转到: %s", route)
         return route
     
     async def _extract_keywords(self, state: AgentState) -> AgentState:
         """提取关键词和时间信息"""
         user_message = state["messages"][-1].content
-        print(f"🔤 [关键词+时间] 开始提取")
+        logger.debug("[关键词+时间] 开始提取")
+        
+        # 短消息本身就是关键词时，直接分词得到结果
+        fast_result = self._fast_extract_keywords(user_message)
+        if fast_result is not None:
+            state["extracted_keywords"], state["extracted_time_period"] = fast_result
+            logger.debug("[关键词+时间] 规则提取结果: %s", fast_result)
+            return state
         
         try:
             messages = [
-                SystemMessage(content=self.KEYWORDS_TIME_EXTRACT_PROMPT),
+                self._sys_keywords_time,
                 HumanMessage(content=user_message)
             ]
             
-            response = await self.llm.ainvoke(messages)
+            response = await self._ainvoke(messages)
             extract_result = response.content.strip()
-            print(f"🔤 [关键词+时间] 提取结果: {extract_result}")
+            logger.debug("[关键词+时间] 提取结果: %s", extract_result)
             
             # 解析结果：关键词1,关键词2|时间参数
             if "|" in extract_result:
@@ -561,37 +851,73 @@ ADD:娱乐
                 logger.warning("无法提取关键词")
             
             # 保存时间参数到状态
-            state["time_period"] = time_part if time_part in ["1d", "1w", "1m", "1y"] else "1w"
+            state["extracted_time_period"] = time_part if time_part in ["1d", "1w", "1m", "1y"] else "1w"
             
         except Exception as e:
             logger.error(f"提取关键词和时间失败: {str(e)}")
             state["extracted_keywords"] = []
-            state["time_period"] = "1w"
+            state["extracted_time_period"] = "1w"
             
         return state
     
-    async def _search_precise(self, state: AgentState) -> AgentState:
-        """准确搜索：提取关键词，添加兴趣，搜索入库"""
+    def _fast_extract_keywords(self, message: str) -> Optional[Tuple[List[str], str]]:
+        """短消息的规则关键词提取，无法可靠提取时返回 None 交由 LLM 处理
+        
+        Returns:
+            Optional[Tuple[List[str], str]]: (关键词列表, 时间参数)
+        """
+        message = message.strip()
+        if not message or len(message) > self.FAST_KEYWORDS_MAX_MESSAGE_LENGTH:
+            return None
+        
+        keywords: List[str] = []
+        time_period = "1w"
+        for pair in pseg.lcut(message):
+            token = pair.word.strip()
+            if not token or token in self.KEYWORD_STOPWORDS or not any(ch.isalnum() for ch in token):
+                continue
+            if token in self.TIME_WORD_PERIODS:
+                time_period = self.TIME_WORD_PERIODS[token]
+                continue
+            # 剩余动词等非名词实词、疑问词或单个汉字，说明句子结构较复杂
+            if pair.flag not in self.KEYWORD_POS_TAGS or token in self.KEYWORD_NON_TOPIC_NOUNS:
+                return None
+            if len(token) == 1 and not token.isascii():
+                return None
+            if token not in keywords:
+                keywords.append(token)
+        
+        if not 1 <= len(keywords) <= 3:
+            return None
+        return keywords, time_period
+    
+    async def _add_interest(self, state: AgentState) -> Dict[str, Any]:
+        """准确搜索分支：将提取的关键词加入用户兴趣（与新闻搜索并行执行）"""
         keywords = state.get("extracted_keywords", [])
-        user_message = state["messages"][-1].content
-        print(f"🎯 [准确搜索] 关键词: {keywords}")
+        if not keywords:
+            return {}
         
         try:
-            if not keywords:
-                state["messages"].append(AIMessage(content="抱歉，无法从您的请求中提取到有效的搜索关键词，请提供更具体的内容。"))
-                return state
-            
-            # 1. 提取时间信息
-            time_period = await self._extract_time_period(user_message)
-            print(f"⏰ [时间提取] 时间范围: {time_period}")
-            
-            # 2. 添加到用户兴趣
             await add_user_interests(state["user_id"], keywords)
             logger.info(f"已将关键词添加到用户兴趣: {keywords}")
-            
-            # 3. 搜索新闻并入库
-            from services.news_service import NewsService
-            news_service = NewsService()
+        except Exception as e:
+            logger.error(f"添加用户兴趣失败: {str(e)}")
+        
+        return {"interest_operation": "ADD"}
+    
+    async def _search_news(self, state: AgentState) -> Dict[str, Any]:
+        """准确搜索分支：按关键词搜索新闻并入库（与兴趣更新并行执行）"""
+        keywords = state.get("extracted_keywords", [])
+        logger.debug("[准确搜索] 关键词: %s", keywords)
+        if not keywords:
+            return {"search_result": None}
+        
+        # 时间范围已在关键词提取时一并得到
+        time_period = state.get("extracted_time_period") or "1w"
+        logger.debug("[时间提取] 时间范围: %s", time_period)
+        
+        try:
+            news_service = await get_news_service()
             expire_days = self._get_expire_days_from_time_period(time_period)
             request = NewsSearchRequest(
                 session_id=state["session_id"],
@@ -605,56 +931,65 @@ ADD:娱乐
             
             result = await news_service.search_and_save_news(request)
             
-            # 4. 格式化响应
             if result.status == "success":
-                saved_count = getattr(result, 'saved_count', 0)
-                total_found = getattr(result, 'total_found', 0)
-                print(f"✅ [搜索成功] 找到{total_found}篇，保存{saved_count}篇")
-                
-                # 时间范围描述
-                time_desc = self._get_time_description(time_period)
-                
-                response = f"""✅ 搜索完成！
-
-🔍 **搜索关键词**: {', '.join(keywords)}
-⏰ **时间范围**: {time_desc}
-📊 **搜索结果**: 找到 {total_found} 篇新闻，新增保存 {saved_count} 篇
-🎯 **兴趣更新**: 已将这些关键词添加到您的兴趣偏好中"""
-            else:
-                response = f"❌ 搜索失败: {getattr(result, 'message', '未知错误')}"
+                logger.debug("[搜索成功] 找到%s篇，保存%s篇", getattr(result, 'total_found', 0), getattr(result, 'saved_count', 0))
             
-            state["messages"].append(AIMessage(content=response))
-            state["search_result"] = {
-                "success": result.status == "success",
-                "keywords": keywords,
-                "time_period": time_period,
-                "saved_count": getattr(result, 'saved_count', 0),
-                "total_found": getattr(result, 'total_found', 0)
+            return {
+                "search_result": {
+                    "success": result.status == "success",
+                    "keywords": keywords,
+                    "time_period": time_period,
+                    "saved_count": getattr(result, 'saved_count', 0),
+                    "total_found": getattr(result, 'total_found', 0),
+                    "message": getattr(result, 'message', '未知错误')
+                }
             }
             
         except Exception as e:
             logger.error(f"准确搜索失败: {str(e)}")
-            state["messages"].append(AIMessage(content="搜索过程中出现错误，请稍后重试。"))
+            return {"search_result": {"success": False, "keywords": keywords, "error": str(e)}}
+    
+    async def _format_search_reply(self, state: AgentState) -> AgentState:
+        """准确搜索分支：汇合兴趣更新与搜索结果，生成回复"""
+        keywords = state.get("extracted_keywords", [])
+        search_result = state.get("search_result")
+        
+        if not keywords:
+            response = "抱歉，无法从您的请求中提取到有效的搜索关键词，请提供更具体的内容。"
+        elif not search_result or "error" in search_result:
+            response = "搜索过程中出现错误，请稍后重试。"
+        elif search_result["success"]:
+            # 时间范围描述
+            time_desc = self._get_time_description(search_result["time_period"])
             
+            response = f"""✅ 搜索完成！
+
+🔍 **搜索关键词**: {', '.join(keywords)}
+⏰ **时间范围**: {time_desc}
+📊 **搜索结果**: 找到 {search_result['total_found']} 篇新闻，新增保存 {search_result['saved_count']} 篇
+🎯 **兴趣更新**: 已将这些关键词添加到您的兴趣偏好中"""
+        else:
+            response = f"❌ 搜索失败: {search_result['message']}"
+        
+        state["messages"].append(AIMessage(content=response))
         return state
     
     async def _search_general(self, state: AgentState) -> AgentState:
         """含糊搜索：根据用户输入自动生成语义关键词搜索"""
         user_message = state["messages"][-1].content
-        print(f"🔍 [含糊搜索] 分析用户输入: {user_message}")
+        logger.debug("[含糊搜索] 分析用户输入: %s", user_message)
         
         try:
-            # 1. 使用AI生成语义相关的关键词
-            general_keywords = await self._generate_general_keywords(user_message)
-            print(f"🎯 [含糊搜索] 生成关键词: {general_keywords}")
-            
-            # 2. 提取时间信息
-            time_period = await self._extract_time_period(user_message)
-            print(f"⏰ [时间提取] 时间范围: {time_period}")
+            # 1-2. 生成语义关键词与提取时间信息互不依赖，并发调用LLM
+            general_keywords, time_period = await asyncio.gather(
+                self._generate_general_keywords(user_message),
+                self._extract_time_period(user_message)
+            )
+            logger.debug("[含糊搜索] 生成关键词: %s", general_keywords)
+            logger.debug("[时间提取] 时间范围: %s", time_period)
             
             # 3. 搜索新闻
-            from services.news_service import NewsService
-            news_service = NewsService()
+            news_service = await get_news_service()
             expire_days = self._get_expire_days_from_time_period(time_period)
             request = NewsSearchRequest(
                 session_id=state["session_id"],
@@ -706,13 +1041,13 @@ ADD:娱乐
         """根据用户输入生成语义相关的搜索关键词"""
         try:
             messages = [
-                SystemMessage(content=self.GENERAL_KEYWORDS_PROMPT),
+                self._sys_general_keywords,
                 HumanMessage(content=user_message)
             ]
             
-            response = await self.llm.ainvoke(messages)
+            response = await self._ainvoke(messages)
             keywords_text = response.content.strip()
-            print(f"🤖 [关键词生成] AI结果: {keywords_text}")
+            logger.debug("[关键词生成] AI结果: %s", keywords_text)
             
             if keywords_text:
                 keywords = [kw.strip() for kw in keywords_text.split(',') if kw.strip()]
@@ -724,7 +1059,6 @@ ADD:娱乐
                 
         except Exception as e:
             logger.error(f"生成语义关键词失败: {str(e)}")
-            print(f"❌ [关键词生成] 失败，使用备用关键词")
             # 异常时使用备用关键词
             return ["热点", "今日"]
     
@@ -732,13 +1066,13 @@ ADD:娱乐
         """从用户输入中提取时间范围信息"""
         try:
             messages = [
-                SystemMessage(content=self.TIME_EXTRACT_PROMPT),
+                self._sys_time_extract,
                 HumanMessage(content=user_message)
             ]
             
-            response = await self.llm.ainvoke(messages)
+            response = await self._ainvoke(messages)
             time_result = response.content.strip()
-            print(f"🕒 [时间提取] AI结果: {time_result}")
+            logger.debug("[时间提取] AI结果: %s", time_result)
             
             # 验证时间范围
             valid_periods = ["1d", "1w", "1m", "1y"]
@@ -750,7 +1084,6 @@ ADD:娱乐
                 
         except Exception as e:
             logger.error(f"提取时间范围失败: {str(e)}")
-            print(f"❌ [时间提取] 失败，使用默认时间范围")
             # 异常时使用默认时间范围
             return "1w"
     
@@ -774,124 +1107,127 @@ ADD:娱乐
         }
         return time_mapping.get(time_period, 7)
     
+    @staticmethod
+    def _split_keywords(text: str) -> List[str]:
+        """拆分逗号分隔的关键词"""
+        return [kw.strip() for kw in text.split(",") if kw.strip()]
+    
     async def _manage_interests(self, state: AgentState) -> AgentState:
         """处理兴趣调整 - 支持智能两阶段SQL自动执行"""
         user_message = state["messages"][-1].content
-        print(f"💫 [兴趣管理] 处理用户请求")
+        logger.debug("[兴趣管理] 处理用户请求")
         
         try:
             # 使用AI分析兴趣调整意图
             messages = [
-                SystemMessage(content=self.INTEREST_INTENT_PROMPT),
+                self._sys_interest_intent,
                 HumanMessage(content=user_message)
             ]
             
-            response = await self.llm.ainvoke(messages)
+            response = await self._ainvoke(messages)
             intent_result = response.content.strip()
             
-            # 解析AI响应，按行处理
+            # 解析AI响应，按行处理；先汇总所有操作，再批量写入数据库
             lines = [line.strip() for line in intent_result.split('\n') if line.strip()]
             operations_performed = []
-            pending_operations = []  # 存储需要第二阶段执行的操作
+            query_requested = False
+            clear_requested = False
+            related_keywords: List[str] = []
+            to_add: List[str] = []
+            to_remove: List[str] = []
             
             for line in lines:
-                if line.startswith("UNKNOWN:"):
+                # 每行格式为 "操作:内容"，按首个冒号切分一次后按操作名分派
+                operation, has_colon, content = line.partition(":")
+                if not has_colon:
+                    continue
+                
+                if operation == "UNKNOWN":
                     state["messages"].append(AIMessage(content="抱歉，我无法理解您的兴趣调整需求，请更明确地表达。"))
                     return state
                 
-                elif line.startswith("QUERY:"):
-                    # 查看当前兴趣
-                    current_interests = await get_user_interests(state["user_id"])
-                    if current_interests:
-                        interests_text = "、".join(current_interests)
-                        operations_performed.append(f"📋 您当前的兴趣偏好：{interests_text}")
-                    else:
-                        operations_performed.append("📋 您还没有设置任何兴趣偏好。")
+                elif operation == "QUERY":
+                    query_requested = True
                 
-                elif line.startswith("QUERY_RELATED:"):
-                    # 智能查询相关兴趣 - 第一阶段
-                    keyword = line.replace("QUERY_RELATED:", "").strip()
+                elif operation == "QUERY_RELATED":
+                    keyword = content.strip()
                     if keyword:
-                        related_interests = await query_related_interests(state["user_id"], keyword)
-                        if related_interests:
-                            operations_performed.append(f"🔍 找到与「{keyword}」相关的兴趣：{', '.join(related_interests)}")
-                            # 自动生成第二阶段删除操作
-                            pending_operations.append(f"REMOVE:{','.join(related_interests)}")
-                        else:
-                            operations_performed.append(f"🔍 未找到与「{keyword}」相关的兴趣")
+                        related_keywords.append(keyword)
+                
+                elif operation == "ADD":
+                    to_add.extend(self._split_keywords(content))
                 
-                elif line.startswith("ADD:"):
-                    keywords_str = line.replace("ADD:", "").strip()
-                    if keywords_str:
-                        keywords = [kw.strip() for kw in keywords_str.split(",") if kw.strip()]
-                        if keywords:
-                            success = await add_user_interests(state["user_id"], keywords)
-                            operations_performed.append(
-                                f"✅ 已将「{', '.join(keywords)}」添加到您的兴趣中" if success 
-                                else "❌ 添加兴趣失败，请稍后重试"
-                            )
+                elif operation == "REMOVE":
+                    to_remove.extend(self._split_keywords(content))
                 
-                elif line.startswith("REMOVE:"):
-                    keywords_str = line.replace("REMOVE:", "").strip()
-                    if keywords_str:
-                        keywords = [kw.strip() for kw in keywords_str.split(",") if kw.strip()]
-                        if keywords:
-                            success = await remove_user_interests(state["user_id"], keywords)
-                            operations_performed.append(
-                                f"✅ 已从您的兴趣中移除「{', '.join(keywords)}」" if success 
-                                else "❌ 移除兴趣失败，请稍后重试"
-                            )
+                elif operation == "CLEAR":
+                    clear_requested = True
                 
-                elif line.startswith("CLEAR:"):
-                    # 清空所有兴趣
-                    success = await clear_user_interests(state["user_id"])
+                elif operation == "REPLACE":
+                    parts = content.strip().split("|")
+                    if len(parts) == 2:
+                        to_remove.extend(self._split_keywords(parts[0]))
+                        to_add.extend(self._split_keywords(parts[1]))
+            
+            # 查看当前兴趣（在修改之前），相关兴趣查询也复用这次读取
+            current_interests: Optional[List[str]] = None
+            if query_requested or related_keywords:
+                current_interests = await get_user_interests(state["user_id"])
+            
+            if query_requested:
+                if current_interests:
+                    interests_text = "、".join(current_interests)
+                    operations_performed.append(f"📋 您当前的兴趣偏好：{interests_text}")
+                else:
+                    operations_performed.append("📋 您还没有设置任何兴趣偏好。")
+            
+            # 智能查询相关兴趣 - 第一阶段，关键词去重后并发查询
+            related_to_remove: List[str] = []
+            if related_keywords and current_interests:
+                unique_keywords = list(dict.fromkeys(related_keywords))
+                related_results = await asyncio.gather(*[
+                    query_related_interests(state["user_id"], keyword, current_interests)
+                    for keyword in unique_keywords
+                ])
+                related_cache = dict(zip(unique_keywords, related_results))
+                for keyword in unique_keywords:
+                    related_interests = related_cache[keyword]
+                    if related_interests:
+                        operations_performed.append(f"🔍 找到与「{keyword}」相关的兴趣：{', '.join(related_interests)}")
+                        related_to_remove.extend(related_interests)
+                    else:
+                        operations_performed.append(f"🔍 未找到与「{keyword}」相关的兴趣")
+            elif related_keywords:
+                for keyword in dict.fromkeys(related_keywords):
+                    operations_performed.append(f"🔍 未找到与「{keyword}」相关的兴趣")
+            
+            # 第二阶段：清空、移除、添加合并为一次数据库更新
+            all_to_remove = list(dict.fromkeys(to_remove + related_to_remove))
+            all_to_add = list(dict.fromkeys(to_add))
+            if clear_requested or all_to_remove or all_to_add:
+                success = await update_user_interests(
+                    state["user_id"], all_to_add, all_to_remove, clear=clear_requested
+                )
+                if clear_requested:
                     operations_performed.append(
-                        "✅ 已清空您的所有兴趣偏好" if success 
+                        "✅ 已清空您的所有兴趣偏好" if success
                         else "❌ 清空兴趣失败，请稍后重试"
                     )
-                
-                elif line.startswith("REPLACE:"):
-                    # 替换兴趣
-                    replace_content = line.replace("REPLACE:", "").strip()
-                    
-                    if "|" in replace_content:
-                        parts = replace_content.split("|")
-                        if len(parts) == 2:
-                            remove_part = parts[0].strip()
-                            add_part = parts[1].strip()
-                            
-                            # 处理删除操作
-                            if remove_part:
-                                remove_keywords = [kw.strip() for kw in remove_part.split(",") if kw.strip()]
-                                if remove_keywords:
-                                    success = await remove_user_interests(state["user_id"], remove_keywords)
-                                    operations_performed.append(
-                                        f"✅ 已从您的兴趣中移除「{', '.join(remove_keywords)}」" if success 
-                                        else "❌ 移除兴趣失败"
-                                    )
-                            
-                            # 处理增加操作
-                            if add_part:
-                                add_keywords = [kw.strip() for kw in add_part.split(",") if kw.strip()]
-                                if add_keywords:
-                                    success = await add_user_interests(state["user_id"], add_keywords)
-                                    operations_performed.append(
-                                        f"✅ 已将「{', '.join(add_keywords)}」添加到您的兴趣中" if success 
-                                        else "❌ 添加兴趣失败"
-                                    )
-            
-            # 执行第二阶段操作（如果有的话）
-            for pending_op in pending_operations:
-                if pending_op.startswith("REMOVE:"):
-                    keywords_str = pending_op.replace("REMOVE:", "").strip()
-                    if keywords_str:
-                        keywords = [kw.strip() for kw in keywords_str.split(",") if kw.strip()]
-                        if keywords:
-                            success = await remove_user_interests(state["user_id"], keywords)
-                            operations_performed.append(
-                                f"✅ 已成功删除相关兴趣：「{', '.join(keywords)}」" if success 
-                                else "❌ 删除相关兴趣失败，请稍后重试"
-                            )
+                if to_remove:
+                    operations_performed.append(
+                        f"✅ 已从您的兴趣中移除「{', '.join(dict.fromkeys(to_remove))}」" if success
+                        else "❌ 移除兴趣失败，请稍后重试"
+                    )
+                if related_to_remove:
+                    operations_performed.append(
+                        f"✅ 已成功删除相关兴趣：「{', '.join(dict.fromkeys(related_to_remove))}」" if success
+                        else "❌ 删除相关兴趣失败，请稍后重试"
+                    )
+                if all_to_add:
+                    operations_performed.append(
+                        f"✅ 已将「{', '.join(all_to_add)}」添加到您的兴趣中" if success
+                        else "❌ 添加兴趣失败，请稍后重试"
+                    )
             
             # 汇总回复
             if operations_performed:
@@ -909,33 +1245,10 @@ ADD:娱乐
     async def _handle_other(self, state: AgentState) -> AgentState:
         """处理其他类型的请求 - 智能对话"""
         user_message = state["messages"][-1].content
-        print(f"💬 [智能对话] 处理非新闻请求")
-        
-        # 构建智能对话的系统提示词
-        system_prompt = """你是一个专业的智能新闻助手，名字叫"新闻小助手"。
-
-你的核心功能：
-1. 新闻搜索：帮助用户搜索和获取各类新闻资讯
-2. 兴趣管理：管理用户的新闻偏好和兴趣标签
-
-当用户进行非新闻相关的对话时，请：
-- 保持友好和专业的态度
-- 简洁回应用户的问题或闲聊
-- 适时自然地引导用户了解你的新闻功能
-- 不要生硬地推销功能，要让对话感觉自然
-
-回复风格：
-- 简洁明了，不要过长
-- 语气友好亲切
-- 可以适当使用emoji增加亲和力
-
-示例：
-用户说"你好"时，可以回复："你好！我是新闻小助手😊 有什么新闻想了解的吗？"
-用户问"今天天气怎么样"时，可以回复："我主要专注新闻资讯哦，不过可以帮你搜索今天的天气新闻！"
-"""
+        logger.debug("[智能对话] 处理非新闻请求")
         
         # 构建对话历史上下文
-        conversation_messages = [SystemMessage(content=system_prompt)]
+        conversation_messages = [self._sys_other_chat]
         
         # 添加最近的对话历史（最多3轮）
         if len(state["messages"]) > 1:
@@ -946,38 +1259,99 @@ ADD:娱乐
         # 添加当前用户消息
         conversation_messages.append(HumanMessage(content=user_message))
         
+        streamed: List[str] = []
         try:
-            # 使用LLM生成智能回复
-            llm_response = await self.llm.ainvoke(conversation_messages)
-            response = llm_response.content.strip()
-            print(f"🤖 [智能回复] 生成完成")
+            response = await self._generate_other_reply(
+                conversation_messages, state.get("token_callback"), streamed
+            )
+            logger.debug("[智能回复] 生成完成")
             
         except Exception as e:
-            logger.error(f"智能对话生成失败: {str(e)}")
-            print(f"❌ [智能对话] 生成失败，使用备用回复")
+            logger.error(f"智能对话生成失败: {type(e).__name__} {str(e)}")
             
-            # 备用回复策略
-            response = "你好！我是新闻小助手，有什么新闻想了解的吗？ 😊"
+            # 备用回复策略：已向客户端推送过内容时保存已推送的文本，保证流式输出与记忆一致
+            response = "".join(streamed).strip()
+            if not response:
+                response = self.OTHER_CHAT_FALLBACK_REPLY
+                # 尚未推送任何内容时，把备用回复推送给客户端
+                token_callback = state.get("token_callback")
+                if token_callback is not None:
+                    try:
+                        await token_callback(response)
+                    except Exception as callback_error:
+                        logger.error(f"推送备用回复失败: {str(callback_error)}")
         
         state["messages"].append(AIMessage(content=response))
         return state
     
+    async def _generate_other_reply(
+        self,
+        conversation_messages: List,
+        token_callback: Optional[Callable[[str], Awaitable[None]]],
+        streamed: List[str]
+    ) -> str:
+        """
+        使用LLM生成智能回复，有流式回调时边生成边推送
+        
+        限时 OTHER_CHAT_TIMEOUT：非流式时限制整个生成；流式时只限制首个片段到达前的等待，
+        片段一旦推送给客户端就不能再被备用回复替换
+        
+        Args:
+            conversation_messages: 发送给模型的消息
+            token_callback: 可选的流式回调
+            streamed: 已推送的片段，生成中途失败时调用方据此保存已推送的文本
+        """
+        if token_callback is None:
+            llm_response = await asyncio.wait_for(
+                self._ainvoke(conversation_messages),
+                timeout=self.OTHER_CHAT_TIMEOUT
+            )
+            return llm_response.content.strip()
+        
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.OTHER_CHAT_TIMEOUT
+        await asyncio.wait_for(llm_semaphore.acquire(), timeout=self.OTHER_CHAT_TIMEOUT)
+        try:
+            stream = self.llm.astream(conversation_messages)
+            iterator = stream.__aiter__()
+            try:
+                while True:
+                    if streamed:
+                        chunk = await iterator.__anext__()
+                    else:
+                        chunk = await asyncio.wait_for(
+                            iterator.__anext__(),
+                            timeout=max(deadline - loop.time(), 0)
+                        )
+                    if chunk.content:
+                        streamed.append(chunk.content)
+                        await token_callback(chunk.content)
+            except StopAsyncIteration:
+                pass
+            finally:
+                await stream.aclose()
+        finally:
+            llm_semaphore.release()
+        return "".join(streamed).strip()
+    
     async def _save_memory(self, state: AgentState) -> AgentState:
         """保存会话记忆"""
-        print(f"💾 [记忆保存] 会话ID: {state['session_id']}")
+        logger.debug("[记忆保存] 会话ID: %s", state['session_id'])
         
         try:
-            # 获取当前记忆
-            memory = self.memory_store.get_memory(state["session_id"]) or {
-                "conversation_history": [],
-                "user_context": {}
-            }
+            # 获取当前记忆：复用本轮开始时已加载的记忆，避免再查询一次数据库
+            memory = state.get("session_memory")
+            if memory is None:
+                memory = await self.memory_store.get_memory_async(state["session_id"]) or {
+                    "conversation_history": [],
+                    "user_context": {}
+                }
             
             # 找到本轮对话的用户输入和AI回复
             messages = state["messages"]
             
-            # 从后往前找，找到最后一个AI消息和它对应的用户消息
-            current_user_msg = None
+            # 本轮用户输入由入口直接写入状态
+            current_user_msg = state.get("current_user_message")
             current_ai_msg = None
             
             # 找到最后的AI消息
@@ -986,20 +1360,13 @@ ADD:娱乐
                     current_ai_msg = messages[i].content
                     break
             
-            # 找到对应的用户消息（在AI消息之前的最后一个用户消息）
-            if current_ai_msg:
+            # 兼容未携带本轮输入的状态：取最后一个不在历史记录中的用户消息
+            if current_ai_msg and current_user_msg is None:
+                seen_user_messages = {hist["user"] for hist in memory["conversation_history"]}
                 for i in range(len(messages) - 1, -1, -1):
-                    if isinstance(messages[i], HumanMessage):
-                        # 检查这是否是当前轮次的用户输入（不在历史记录中）
-                        user_content = messages[i].content
-                        # 如果这个用户消息不在历史记录中，说明是当前轮次的
-                        is_in_history = any(
-                            hist["user"] == user_content 
-                            for hist in memory["conversation_history"]
-                        )
-                        if not is_in_history:
-                            current_user_msg = user_content
-                            break
+                    if isinstance(messages[i], HumanMessage) and messages[i].content not in seen_user_messages:
+                        current_user_msg = messages[i].content
+                        break
             
             if current_user_msg and current_ai_msg:
                 memory["conversation_history"].append({
@@ -1012,15 +1379,25 @@ ADD:娱乐
                 if len(memory["conversation_history"]) > 10:
                     memory["conversation_history"] = memory["conversation_history"][-10:]
                 
-                print(f"✅ [记忆保存] 成功保存，历史记录: {len(memory['conversation_history'])}条")
+                logger.debug("[记忆保存] 成功保存，历史记录: %s条", len(memory['conversation_history']))
+                
+                # 同步更新历史消息对象缓存，下一轮无需重新构建
+                _append_history_messages(state["session_id"], memory["conversation_history"])
                 
-                # 保存记忆
-                self.memory_store.save_memory(state["session_id"], memory)
+                # 后台保存记忆，不阻塞本轮回复
+                task = asyncio.create_task(
+                    self.memory_store.save_memory_async(state["session_id"], memory)
+                )
+                _background_tasks.add(task)
+                task.add_done_callback(_background_tasks.discard)
             else:
-                print(f"⚠️ [记忆保存] 未找到有效对话，跳过保存")
+                logger.debug("[记忆保存] 未找到有效对话，跳过保存")
             
         except Exception as e:
             logger.warning(f"保存记忆失败: {str(e)}")
-            print(f"❌ [记忆保存] 失败: {str(e)}")
         
-        return state
\ No newline at end of file
+        return state
+
+
+# 模块导入时编译一次工作流，所有服务实例共享
+NewsAgentService._COMPILED_GRAPH = NewsAgentService._build_graph()
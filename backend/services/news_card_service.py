@@ -11,7 +11,7 @@ from datetime import datetime, timedelta
 from loguru import logger
 
 from services.qwen_service import QWENService
-from services.news_service import NewsService
+from services.news_service import news_service
 from services.vector_db_service import get_vector_db
 from models.news_card import (
     NewsCard, NewsCardMetadata, NewsTheme, EntityMention,
@@ -26,9 +26,12 @@ from core.config import settings
 class NewsCardService:
     """新闻结构化卡片生成服务"""
     
+    # 预编译的 JSON 片段匹配规则
+    _JSON_OBJECT_RE = re.compile(r'\{.*\}', re.DOTALL)
+    
     def __init__(self):
         self.qwen_service = QWENService()
-        self.news_service = NewsService()
+        self.news_service = news_service
         self.vector_service = get_vector_db()
         
     async def generate_card(self, request: NewsCardRequest) -> NewsCardResponse:
@@ -257,7 +260,7 @@ class NewsCardService:
                 'enhanced_summary': result.get('enhanced_summary', '')[:max_length * 2],
                 'key_points': result.get('key_points', [])[:5],
                 'keywords': result.get('keywords', [])[:10],
-                'hashtags': [tag if tag.startswith('#') else f"#{tag}" for tag in result.get('hashtags', [])][:5]
+                'hashtags': [tag if tag.startswith('#') else f"#{tag}" for tag in result.get('hashtags', [])[:5]]
             }
         except Exception as e:
             logger.error(f"生成摘要失败: {e}")
@@ -619,7 +622,7 @@ class NewsCardService:
             return json.loads(response)
         except json.JSONDecodeError:
             # 尝试提取JSON部分
-            json_match = re.search(r'\{.*\}', response, re.DOTALL)
+            json_match = self._JSON_OBJECT_RE.search(response)
             if json_match:
                 try:
                     return json.loads(json_match.group())
@@ -10,6 +10,7 @@ from dataclasses import dataclass
 import json
 import logging
 import hashlib
+import re
 
 from models.chat import (
     ChatSession, ChatMessage, ChatMessageCreate, ChatSessionCreate,
@@ -44,6 +45,17 @@ class NewsConversationContext:
 class NewsChatService:
     """新闻对话服务"""
     
+    # 追问类型及其关键词（按优先级排列），每类预编译为一条交替正则
+    FOLLOW_UP_PATTERNS = [
+        (follow_type, re.compile("|".join(map(re.escape, keywords))))
+        for follow_type, keywords in (
+            ("detail_request", ["详细", "具体", "深入", "更多", "解释"]),
+            ("comparison", ["比较", "对比", "差别", "相似", "不同"]),
+            ("prediction", ["预测", "未来", "趋势", "发展", "影响"]),
+            ("related_news", ["相关", "类似", "其他", "还有"])
+        )
+    ]
+    
     def __init__(self):
         self.rag_card_service = RAGEnhancedCardService()
         self.qwen_service = QWENService()
@@ -53,6 +65,14 @@ class NewsChatService:
         self._sessions: Dict[str, ChatSession] = {}
         self._messages: Dict[str, List[ChatMessage]] = {}
         self._contexts: Dict[str, NewsConversationContext] = {}
+        
+        # 追问类型 -> 处理方法，未匹配的类型走通用回复
+        self._follow_up_handlers = {
+            "detail_request": self._provide_detailed_analysis,
+            "comparison": self._provide_comparison_analysis,
+            "prediction": self._provide_trend_prediction,
+            "related_news": self._find_related_news,
+        }
     
     async def create_news_session(
         self,
@@ -217,14 +237,9 @@ class NewsChatService:
         follow_up_type = await self._analyze_follow_up_type(user_message, context)
         
         # 根据追问类型生成回复
-        if follow_up_type == "detail_request":
-            response = await self._provide_detailed_analysis(user_message, context)
-        elif follow_up_type == "comparison":
-            response = await self._provide_comparison_analysis(user_message, context)
-        elif follow_up_type == "prediction":
-            response = await self._provide_trend_prediction(user_message, context)
-        elif follow_up_type == "related_news":
-            response = await self._find_related_news(user_message, context)
+        handler = self._follow_up_handlers.get(follow_up_type)
+        if handler is not None:
+            response = await handler(user_message, context)
         else:
             response = await self._generate_general_response(
                 user_message, context, conversation_history
@@ -406,17 +421,10 @@ class NewsChatService:
     ) -> str:
         """分析追问类型"""
         
-        keywords_map = {
-            "detail_request": ["详细", "具体", "深入", "更多", "解释"],
-            "comparison": ["比较", "对比", "差别", "相似", "不同"],
-            "prediction": ["预测", "未来", "趋势", "发展", "影响"],
-            "related_news": ["相关", "类似", "其他", "还有"]
-        }
-        
         user_lower = user_message.lower()
         
-        for follow_type, keywords in keywords_map.items():
-            if any(keyword in user_lower for keyword in keywords):
+        for follow_type, pattern in self.FOLLOW_UP_PATTERNS:
+            if pattern.search(user_lower):
                 return follow_type
         
         return "general"
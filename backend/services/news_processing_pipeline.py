@@ -4,6 +4,7 @@
 """
 
 import asyncio
+import heapq
 import time
 import uuid
 from datetime import datetime
@@ -15,7 +16,7 @@ from pydantic import BaseModel, Field
 
 from core.database import get_mongodb_database, Collections
 from core.config import settings
-from services.news_service import NewsService, NewsSearchResult
+from services.news_service import NewsSearchResult, get_news_service
 from services.qwen_service import QWENService
 from services.news_card_service import NewsCardService
 from services.embedding_service import QWenEmbeddingService
@@ -120,7 +121,7 @@ class NewsProcessingPipeline:
     async def _initialize_services(self):
         """初始化所有服务"""
         if not self.news_service:
-            self.news_service = NewsService()
+            self.news_service = await get_news_service()
             self.qwen_service = QWENService()
             self.card_service = NewsCardService()
             self.embedding_service = QWenEmbeddingService()
@@ -628,7 +629,7 @@ class NewsProcessingPipeline:
 
             # 获取用户最感兴趣的话题
             interests = user_prefs["interests"]
-            top_interests = sorted(interests.items(), key=lambda x: x[1], reverse=True)[:5]
+            top_interests = heapq.nlargest(5, interests.items(), key=lambda x: x[1])
 
             recommendations = []
             for interest, _ in top_interests:
@@ -2,14 +2,18 @@
 新闻搜索服务 - 使用 SerpAPI
 """
 import asyncio
+import hashlib
 import httpx
+import orjson
 from datetime import datetime, timedelta
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 from pydantic import BaseModel
+from pymongo.errors import BulkWriteError
 import logging
 from core.config import settings
 from core.database import get_mongodb_database, Collections
-from models.news import NewsModel
+from core.cache import cache, CacheKeys
+from models.news import NewsModel, NewsSearchRequest, NewsSource, NewsCategory
 
 logger = logging.getLogger(__name__)
 
@@ -34,13 +38,30 @@ class NewsSearchResult(BaseModel):
     timestamp: datetime
 
 
+class NewsSaveResult(BaseModel):
+    """新闻搜索入库结果模型"""
+    status: str
+    message: str = ""
+    total_found: int = 0
+    saved_count: int = 0
+    updated_count: int = 0
+
+
 class NewsService:
     """新闻搜索服务"""
     
+    # 相同参数的 SerpAPI 搜索结果缓存时间（秒）
+    SEARCH_CACHE_TTL = 300
+    
     def __init__(self):
         self.api_key = settings.SERPAPI_KEY
         self.base_url = "https://serpapi.com/search.json"
-        self.client = httpx.AsyncClient(timeout=30.0)
+        # 进程内共享的连接池，HTTP/2 下并发搜索复用同一条连接
+        self.client = httpx.AsyncClient(
+            timeout=30.0,
+            http2=True,
+            limits=httpx.Limits(max_connections=32, max_keepalive_connections=16)
+        )
     
     async def search_news(
         self,
@@ -77,11 +98,18 @@ class NewsService:
             if time_period:
                 params["tbs"] = f"qdr:{time_period}"
             
-            response = await self.client.get(self.base_url, params=params)
-            response.raise_for_status()
-            
-            data = response.json()
-            articles = self._parse_news_results(data)
+            # 短时间内重复的相同搜索直接复用缓存结果
+            cache_key = self._search_cache_key(params)
+            cached_articles = await cache.get_json(cache_key, NewsArticle)
+            if isinstance(cached_articles, list):
+                articles = cached_articles
+            else:
+                response = await self.client.get(self.base_url, params=params)
+                response.raise_for_status()
+                
+                data = orjson.loads(response.content)
+                articles = self._parse_news_results(data, params["num"])
+                await cache.set_json(cache_key, articles, expire=self.SEARCH_CACHE_TTL)
             
             search_time = (datetime.now() - start_time).total_seconds()
             
@@ -97,12 +125,27 @@ class NewsService:
             logger.error(f"新闻搜索失败: {str(e)}")
             raise
     
-    def _parse_news_results(self, data: Dict[str, Any]) -> List[NewsArticle]:
-        """解析 SerpAPI 返回的新闻结果"""
+    @staticmethod
+    def _search_cache_key(params: Dict[str, Any]) -> str:
+        """根据搜索参数（不含 API Key）生成缓存键"""
+        digest = hashlib.blake2b(
+            repr(sorted((k, v) for k, v in params.items() if k != "api_key")).encode("utf-8"),
+            digest_size=8
+        ).hexdigest()
+        return f"{CacheKeys.NEWS_SEARCH}{digest}"
+    
+    def _parse_news_results(self, data: Dict[str, Any], limit: Optional[int] = None) -> List[NewsArticle]:
+        """
+        解析 SerpAPI 返回的新闻结果
+        
+        Args:
+            data: SerpAPI 响应 JSON
+            limit: 最多解析的结果数量（google_news 引擎会忽略 num 参数返回更多结果）
+        """
         articles = []
         
         if "news_results" in data:
-            for idx, item in enumerate(data["news_results"]):
+            for idx, item in enumerate(data["news_results"][:limit]):
                 try:
                     # 处理source字段，可能是字符串或字典
                     source_data = item.get("source", "")
@@ -127,6 +170,145 @@ class NewsService:
         
         return articles
     
+    async def search_and_save_news(self, request: NewsSearchRequest) -> NewsSaveResult:
+        """
+        按关键词搜索新闻并保存到会话新闻库（供智能助手使用）
+        
+        Args:
+            request: 智能新闻搜索请求
+        """
+        try:
+            search_result = await self.search_news(
+                query=" ".join(request.keywords),
+                num_results=request.num_results,
+                language=request.language,
+                country=request.country,
+                time_period=request.time_period
+            )
+            
+            saved_count, updated_count = await self._smart_save_articles(search_result.articles, request)
+            
+            return NewsSaveResult(
+                status="success",
+                message=f"找到 {search_result.total_results} 篇新闻，新增 {saved_count} 篇",
+                total_found=search_result.total_results,
+                saved_count=saved_count,
+                updated_count=updated_count
+            )
+            
+        except Exception as e:
+            logger.error(f"搜索并保存新闻失败: {str(e)}")
+            return NewsSaveResult(status="error", message=str(e))
+    
+    async def _smart_save_articles(
+        self,
+        articles: List[NewsArticle],
+        request: NewsSearchRequest
+    ) -> Tuple[int, int]:
+        """
+        批量去重保存新闻：新文章直接批量插入，重复键的已有文章再合并关键词
+        
+        Returns:
+            Tuple[int, int]: (新增数量, 更新关键词的数量)
+        """
+        db = await get_mongodb_database()
+        if db is None:
+            raise RuntimeError("数据库连接未初始化")
+        
+        news_collection = db[Collections.NEWS]
+        
+        # 同一批结果内按 (标题, 链接) 去重
+        unique_articles: Dict[Tuple[str, str], NewsArticle] = {}
+        for article in articles:
+            if article.title and article.link:
+                unique_articles.setdefault((article.title, article.link), article)
+        if not unique_articles:
+            return 0, 0
+        
+        now = datetime.utcnow()
+        expire_at = now + timedelta(days=request.expire_days)
+        id_hasher = self._news_id_hasher(request.session_id)
+        keywords = list(request.keywords)
+        
+        # 多数文章是新文章：直接批量插入，_id 由会话、链接和标题决定，已存在的文章会触发重复键
+        news_docs = [
+            self._build_news_document(article, request, now, expire_at, id_hasher)
+            for article in unique_articles.values()
+        ]
+        saved_count = 0
+        duplicate_ids = []
+        try:
+            result = await news_collection.insert_many(news_docs, ordered=False)
+            saved_count = len(result.inserted_ids)
+        except BulkWriteError as e:
+            saved_count = e.details.get("nInserted", 0)
+            for error in e.details.get("writeErrors", []):
+                if error.get("code") == 11000:
+                    duplicate_ids.append(news_docs[error["index"]]["_id"])
+                else:
+                    logger.warning(f"保存新闻失败: {error.get('errmsg')}")
+        
+        # 仅已存在且缺少本次关键词的文章走合并路径，在服务端补充关键词
+        updated_count = 0
+        if duplicate_ids and keywords:
+            result = await news_collection.update_many(
+                {"_id": {"$in": duplicate_ids}, "keywords": {"$not": {"$all": keywords}}},
+                {
+                    "$addToSet": {"keywords": {"$each": keywords}},
+                    "$set": {"updated_at": now}
+                }
+            )
+            updated_count = result.modified_count
+        
+        logger.info(f"新闻入库完成 [会话: {request.session_id}]: 新增 {saved_count} 篇，更新 {updated_count} 篇")
+        return saved_count, updated_count
+    
+    def _build_news_document(
+        self,
+        article: NewsArticle,
+        request: NewsSearchRequest,
+        now: datetime,
+        expire_at: datetime,
+        id_hasher: "hashlib._Hash"
+    ) -> Dict[str, Any]:
+        """构建待入库的新闻文档"""
+        return {
+            "_id": self._generate_news_id(id_hasher, article.title, article.link),
+            "session_id": request.session_id,
+            "title": article.title,
+            "summary": article.snippet,
+            "content": article.snippet,
+            "url": article.link,
+            "image_url": article.thumbnail,
+            "source": NewsSource.SERPAPI.value,
+            "category": NewsCategory.GENERAL.value,
+            "publisher": article.source,
+            "keywords": list(request.keywords),
+            "date": article.date,
+            "published_at": now,
+            "created_at": now,
+            "updated_at": now,
+            "expire_at": expire_at,
+            "metadata": {"position": article.position}
+        }
+    
+    @staticmethod
+    def _news_id_hasher(session_id: str) -> "hashlib._Hash":
+        """预先写入会话ID的哈希器，同一批文章复用，避免重复编码会话ID"""
+        hasher = hashlib.blake2b(digest_size=16)
+        hasher.update(session_id.encode("utf-8"))
+        hasher.update(b"\0")
+        return hasher
+    
+    @staticmethod
+    def _generate_news_id(id_hasher: "hashlib._Hash", title: str, url: str) -> str:
+        """根据会话、链接和标题生成稳定的新闻ID（分段哈希，不拼接临时字符串）"""
+        hasher = id_hasher.copy()
+        hasher.update(url.encode("utf-8"))
+        hasher.update(b"\0")
+        hasher.update(title.encode("utf-8"))
+        return hasher.hexdigest()
+    
     async def search_trending_news(
         self,
         language: str = "zh-cn",
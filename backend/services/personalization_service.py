@@ -111,7 +111,8 @@ class PersonalizationService:
                 {
                     "user_id": user_id,
                     "interaction_type": {"$in": ["view", "like", "share"]}
-                }
+                },
+                projection={"_id": 0, "content_id": 1, "interaction_type": 1, "timestamp": 1, "metadata": 1}
             ).sort("timestamp", -1).limit(limit)
             
             history = []
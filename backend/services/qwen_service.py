@@ -5,7 +5,7 @@ QWEN 模型服务 - 处理与通义千问 API 的交互
 import asyncio
 import json
 import time
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, AsyncIterator
 from dataclasses import dataclass
 import httpx
 from loguru import logger
@@ -52,6 +52,7 @@ class QWENService:
             }
             
             self.client = httpx.AsyncClient(
+                base_url=self.base_url,
                 headers=headers,
                 timeout=30.0
             )
@@ -306,7 +307,7 @@ Markdown格式要求：
         
         try:
             response = await client.post(
-                f"{self.base_url}/chat/completions",
+                "/chat/completions",
                 json=payload
             )
             response.raise_for_status()
@@ -333,6 +334,63 @@ Markdown格式要求：
             logger.error(f"QWEN API 调用失败: {e}")
             raise
     
+    async def _stream_qwen_api(
+        self,
+        messages: List[Dict[str, str]],
+        temperature: float = 0.7,
+        max_tokens: int = 1000,
+        usage: Optional[Dict[str, Any]] = None
+    ) -> AsyncIterator[str]:
+        """
+        以 SSE 流式调用 QWEN API，逐段产出增量文本
+        
+        Args:
+            messages: 消息列表
+            temperature: 生成温度
+            max_tokens: 最大令牌数
+            usage: 可选，流结束时写入接口返回的令牌用量
+        """
+        client = await self._get_client()
+        
+        payload = {
+            "model": self.model,
+            "messages": messages,
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+            "stream": True,
+            "stream_options": {"include_usage": True}
+        }
+        
+        try:
+            async with client.stream("POST", "/chat/completions", json=payload) as response:
+                if response.is_error:
+                    await response.aread()
+                    response.raise_for_status()
+                
+                async for line in response.aiter_lines():
+                    if not line.startswith("data:"):
+                        continue
+                    data = line[5:].strip()
+                    if data == "[DONE]":
+                        break
+                    
+                    chunk = json.loads(data)
+                    if usage is not None and chunk.get("usage"):
+                        usage.update(chunk["usage"])
+                    
+                    choices = chunk.get("choices") or []
+                    if choices:
+                        delta = choices[0].get("delta", {}).get("content")
+                        if delta:
+                            yield delta
+                            
+        except httpx.HTTPStatusError as e:
+            logger.error(f"QWEN 流式 API HTTP 错误: {e.response.status_code} - {e.response.text}")
+            raise Exception(f"API 请求失败: {e.response.status_code}")
+        except Exception as e:
+            logger.error(f"QWEN 流式 API 调用失败: {e}")
+            raise
+    
     async def get_model_status(self) -> Dict[str, Any]:
         """获取模型状态"""
         try:
@@ -347,7 +405,7 @@ Markdown格式要求：
             
             start_time = time.time()
             response = await client.post(
-                f"{self.base_url}/chat/completions",
+                "/chat/completions",
                 json=test_payload
             )
             response_time = time.time() - start_time
@@ -4,6 +4,7 @@ RAG增强版新闻卡片生成服务
 """
 
 import asyncio
+import heapq
 import json
 import time
 import re
@@ -26,6 +27,9 @@ from core.config import settings
 class RAGEnhancedCardService:
     """RAG增强版新闻卡片生成服务"""
     
+    # 预编译的 JSON 片段匹配规则
+    _JSON_OBJECT_RE = re.compile(r'\{.*\}', re.DOTALL)
+    
     def __init__(self):
         self.qwen_service = QWENService()
         self.vector_service = get_vector_db()
@@ -312,7 +316,7 @@ class RAGEnhancedCardService:
                     similarity_scores[news_id] = score
         
         # 按相似度排序，取前10个
-        sorted_ids = sorted(all_news_ids, key=lambda x: similarity_scores.get(x, 0), reverse=True)[:10]
+        sorted_ids = heapq.nlargest(10, all_news_ids, key=lambda x: similarity_scores.get(x, 0))
         
         return {
             'news_ids': sorted_ids,
@@ -664,7 +668,7 @@ class RAGEnhancedCardService:
         try:
             return json.loads(response)
         except json.JSONDecodeError:
-            json_match = re.search(r'\{.*\}', response, re.DOTALL)
+            json_match = self._JSON_OBJECT_RE.search(response)
             if json_match:
                 try:
                     return json.loads(json_match.group())
@@ -2,7 +2,7 @@
 LangChain 风格文本分块器
 """
 
-import re
+import bisect
 import tiktoken
 from typing import List, Dict, Any, Optional
 from loguru import logger
@@ -108,8 +108,8 @@ class RecursiveTextChunker:
     # ---------- 内部辅助方法 ----------
     
     def _preprocess_text(self, text: str) -> str:
-        """去除多余空白"""
-        return re.sub(r"\s+", " ", text).strip()
+        """去除多余空白（str.split 按任意空白切分并丢弃首尾，无需正则替换）"""
+        return " ".join(text.split())
     
     def _recursive_split(self, text: str, seps: List[str]) -> List[str]:
         """按优先级递归分割"""
@@ -136,15 +136,23 @@ class RecursiveTextChunker:
         return results
     
     def _character_split(self, text: str) -> List[str]:
-        """按字符粗分"""
+        """按字符粗分：整段只编码一次，用各 token 的字符偏移定位分块边界，不再逐字符重新计数"""
+        tokens = self.encoding.encode(text)
+        if not tokens:
+            return [text.strip()] if text.strip() else []
+        _, offsets = self.encoding.decode_with_offsets(tokens)
+        
         res = []
         start = 0
         while start < len(text):
-            end = start
-            tokens = 0
-            while end < len(text) and tokens < self.chunk_size:
-                end += 1
-                tokens = self.count_tokens(text[start:end])
+            # 从 start 处的 token 起向后数 chunk_size 个 token，取其字符位置作为块尾
+            end_token = bisect.bisect_left(offsets, start) + self.chunk_size
+            end = offsets[end_token] if end_token < len(offsets) else len(text)
+            if end <= start:
+                end = start + 1
+            # 整段编码与单独编码在窗口边缘的 BPE 切分可能不同，按块单独复核一次，超出上限时逐字符回退
+            while end - start > 1 and self.count_tokens(text[start:end]) > self.chunk_size:
+                end -= 1
             if end < len(text):
                 while end > start and text[end-1] not in [" ", "\n", "\t"]:
                     end -= 1
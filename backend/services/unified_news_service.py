@@ -7,11 +7,13 @@ import asyncio
 import time
 from datetime import datetime
 from typing import List, Dict, Any, Optional
+from bson import ObjectId
 from pydantic import BaseModel, Field
+from pymongo.errors import BulkWriteError
 from loguru import logger
 
 from core.database import get_mongodb_database, Collections
-from services.news_service import NewsService
+from services.news_service import get_news_service
 from services.qwen_service import QWENService
 from services.news_card_service import NewsCardService
 from models.news import NewsModel, NewsSource, NewsCategory
@@ -68,6 +70,9 @@ class UnifiedNewsResponse(BaseModel):
 class UnifiedNewsService:
     """统一新闻处理服务"""
     
+    # 新闻卡片并发生成上限
+    CARD_CONCURRENCY = 5
+    
     def __init__(self):
         self.news_service = None
         self.qwen_service = None
@@ -76,7 +81,7 @@ class UnifiedNewsService:
     async def _get_services(self):
         """获取所需的服务实例"""
         if not self.news_service:
-            self.news_service = NewsService()
+            self.news_service = await get_news_service()
         if not self.qwen_service:
             self.qwen_service = QWENService()
         if not self.card_service:
@@ -183,49 +188,46 @@ class UnifiedNewsService:
             )
     
     async def _store_news_articles(self, articles, user_id: str) -> tuple[List[NewsModel], int]:
-        """存储新闻文章到MongoDB"""
+        """存储新闻文章到MongoDB：一次查询已有链接，新文章以文档字典批量插入"""
         stored_news = []
         storage_count = 0
         
         try:
             db = await get_mongodb_database()
-            if not db:
+            if db is None:
                 logger.warning("数据库连接失败，跳过存储")
                 return stored_news, 0
             
+            news_collection = db[Collections.NEWS]
+            
+            # 一次查询找出已入库的文章
+            urls = list({article.link for article in articles})
+            known_docs = {
+                doc["url"]: doc
+                async for doc in news_collection.find(
+                    {"url": {"$in": urls}},
+                    projection={"title": 1, "content": 1, "summary": 1, "url": 1, "published_at": 1}
+                )
+            }
+            
+            now = datetime.utcnow()
+            new_docs = []
+            article_docs = []
             for article in articles:
-                try:
-                    # 检查是否已存在
-                    existing = await db[Collections.NEWS].find_one({
-                        "url": article.link
-                    })
-                    
-                    if existing:
-                        # 转换为NewsModel
-                        news_model = NewsModel(
-                            id=str(existing["_id"]),
-                            title=existing["title"],
-                            content=existing.get("content", ""),
-                            summary=existing.get("summary", ""),
-                            url=existing["url"],
-                            source=NewsSource.SERPAPI,
-                            category=NewsCategory.OTHER,
-                            published_at=existing.get("published_at", datetime.utcnow())
-                        )
-                        stored_news.append(news_model)
-                        continue
-                    
-                    # 创建新的新闻记录
+                news_doc = known_docs.get(article.link)
+                if news_doc is None:
+                    # 创建新的新闻记录（同批次重复链接只插入一次）
                     news_doc = {
+                        "_id": ObjectId(),
                         "title": article.title,
                         "content": article.snippet,
                         "summary": article.snippet,
                         "url": article.link,
                         "source": NewsSource.SERPAPI.value,
                         "category": NewsCategory.OTHER.value,
-                        "published_at": datetime.utcnow(),
-                        "created_at": datetime.utcnow(),
-                        "updated_at": datetime.utcnow(),
+                        "published_at": now,
+                        "created_at": now,
+                        "updated_at": now,
                         "created_by": user_id,
                         "metadata": {
                             "serpapi_source": article.source,
@@ -233,34 +235,48 @@ class UnifiedNewsService:
                             "thumbnail": article.thumbnail
                         }
                     }
-                    
-                    result = await db[Collections.NEWS].insert_one(news_doc)
-                    
-                    # 转换为NewsModel
-                    news_model = NewsModel(
-                        id=str(result.inserted_id),
-                        title=article.title,
-                        content=article.snippet,
-                        summary=article.snippet,
-                        url=article.link,
-                        source=NewsSource.SERPAPI,
-                        category=NewsCategory.OTHER,
-                        published_at=datetime.utcnow()
-                    )
-                    
-                    stored_news.append(news_model)
-                    storage_count += 1
-                    
-                except Exception as e:
-                    logger.warning(f"存储单条新闻失败: {e}")
-                    continue
+                    known_docs[article.link] = news_doc
+                    new_docs.append(news_doc)
+                
+                article_docs.append(news_doc)
+            
+            failed_ids = set()
+            if new_docs:
+                try:
+                    result = await news_collection.insert_many(new_docs, ordered=False)
+                    storage_count = len(result.inserted_ids)
+                except BulkWriteError as e:
+                    storage_count = e.details.get("nInserted", 0)
+                    write_errors = e.details.get("writeErrors", [])
+                    # 未写入的文档不返回，避免响应中出现不存在的新闻ID
+                    failed_ids = {new_docs[error["index"]]["_id"] for error in write_errors}
+                    logger.warning(f"批量存储新闻部分失败: {len(write_errors)} 条")
             
+            stored_news = [
+                self._to_news_model(news_doc, now)
+                for news_doc in article_docs
+                if news_doc["_id"] not in failed_ids
+            ]
             return stored_news, storage_count
             
         except Exception as e:
             logger.error(f"存储新闻失败: {e}")
             return stored_news, 0
     
+    @staticmethod
+    def _to_news_model(news_doc: Dict[str, Any], now: datetime) -> NewsModel:
+        """将新闻文档转换为响应用的 NewsModel"""
+        return NewsModel(
+            id=str(news_doc["_id"]),
+            title=news_doc["title"],
+            content=news_doc.get("content", ""),
+            summary=news_doc.get("summary", ""),
+            url=news_doc["url"],
+            source=NewsSource.SERPAPI,
+            category=NewsCategory.OTHER,
+            published_at=news_doc.get("published_at", now)
+        )
+    
     async def _generate_ai_summary(self, articles, query: str) -> Optional[str]:
         """生成AI分析摘要"""
         try:
@@ -295,36 +311,38 @@ class UnifiedNewsService:
             return None
     
     async def _generate_news_cards(self, news_list: List[NewsModel], request: UnifiedNewsRequest) -> tuple[List[Dict], int]:
-        """生成新闻卡片"""
-        cards = []
-        cards_generated = 0
+        """生成新闻卡片（有界并发）"""
+        semaphore = asyncio.Semaphore(self.CARD_CONCURRENCY)
         
-        try:
-            for news in news_list:
-                try:
-                    card_request = NewsCardRequest(
-                        news_id=news.id,
-                        include_sentiment=request.include_sentiment,
-                        include_summary=request.include_summary,
-                        include_entities=True,
-                        max_summary_length=200
-                    )
-                    
+        async def generate_one(news: NewsModel) -> Optional[Dict]:
+            try:
+                card_request = NewsCardRequest(
+                    news_id=news.id,
+                    include_sentiment=request.include_sentiment,
+                    include_summary=request.include_summary,
+                    include_entities=True,
+                    max_summary_length=200
+                )
+                
+                async with semaphore:
                     card_response = await self.card_service.generate_card(card_request)
-                    
-                    if card_response and card_response.card:
-                        cards.append(card_response.card.dict())
-                        cards_generated += 1
-                    
-                except Exception as e:
-                    logger.warning(f"生成新闻卡片失败 {news.id}: {e}")
-                    continue
-            
-            return cards, cards_generated
+                
+                if card_response and card_response.card:
+                    return card_response.card.dict()
+                return None
+                
+            except Exception as e:
+                logger.warning(f"生成新闻卡片失败 {news.id}: {e}")
+                return None
+        
+        try:
+            results = await asyncio.gather(*[generate_one(news) for news in news_list])
+            cards = [card for card in results if card is not None]
+            return cards, len(cards)
             
         except Exception as e:
             logger.error(f"批量生成新闻卡片失败: {e}")
-            return cards, 0
+            return [], 0
 
 
 # 服务实例
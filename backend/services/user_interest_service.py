@@ -9,6 +9,7 @@ from datetime import datetime
 from bson import ObjectId
 
 from core.database import get_mongodb_database
+from core.llm_limiter import llm_semaphore
 from models.user import UserPreferences
 
 logger = logging.getLogger(__name__)
@@ -25,7 +26,20 @@ class UserInterestService:
     
     def __init__(self) -> None:
         """初始化服务"""
-        pass
+        self._semantic_llm = None
+    
+    def _get_semantic_llm(self):
+        """获取语义分析用的 LLM 客户端（首次使用时创建，之后复用）"""
+        if self._semantic_llm is None:
+            from langchain_community.chat_models import ChatTongyi
+            from core.config import settings
+            
+            self._semantic_llm = ChatTongyi(
+                streaming=False,
+                model="qwen-turbo",
+                dashscope_api_key=settings.DASHSCOPE_API_KEY
+            )
+        return self._semantic_llm
     
     async def add_user_interests(self, user_id: str, new_interests: List[str]) -> bool:
         """
@@ -53,7 +67,10 @@ class UserInterestService:
                 logger.error(f"无效的用户ID格式: {user_id}, 错误: {e}")
                 return False
                 
-            user_doc = await users_collection.find_one({"_id": object_id})
+            user_doc = await users_collection.find_one(
+                {"_id": object_id},
+                {"news_preferences.news_interests": 1}
+            )
             
             if not user_doc:
                 logger.warning(f"用户不存在: {user_id}")
@@ -121,7 +138,10 @@ class UserInterestService:
                 logger.error(f"无效的用户ID格式: {user_id}, 错误: {e}")
                 return False
                 
-            user_doc = await users_collection.find_one({"_id": object_id})
+            user_doc = await users_collection.find_one(
+                {"_id": object_id},
+                {"news_preferences.news_interests": 1}
+            )
             
             if not user_doc:
                 logger.warning(f"用户不存在: {user_id}")
@@ -159,6 +179,89 @@ class UserInterestService:
             logger.error(f"移除用户兴趣失败: {str(e)}")
             return False
     
+    async def update_user_interests(
+        self,
+        user_id: str,
+        interests_to_add: List[str],
+        interests_to_remove: List[str],
+        clear: bool = False
+    ) -> bool:
+        """
+        批量更新用户兴趣：一次读取、一次写入完成清空、移除和添加
+        
+        Args:
+            user_id: 用户ID
+            interests_to_add: 要添加的兴趣列表
+            interests_to_remove: 要移除的兴趣列表
+            clear: 是否先清空现有兴趣
+            
+        Returns:
+            bool: 操作是否成功
+        """
+        try:
+            db = await get_mongodb_database()
+            if db is None:
+                logger.error("数据库连接失败")
+                return False
+            
+            users_collection = db[Collections.USERS]
+            
+            # 将字符串ID转换为ObjectId
+            try:
+                object_id = ObjectId(user_id) if isinstance(user_id, str) else user_id
+            except Exception as e:
+                logger.error(f"无效的用户ID格式: {user_id}, 错误: {e}")
+                return False
+                
+            user_doc = await users_collection.find_one(
+                {"_id": object_id},
+                {"news_preferences.news_interests": 1}
+            )
+            
+            if not user_doc:
+                logger.warning(f"用户不存在: {user_id}")
+                return False
+            
+            # 按 清空 -> 移除 -> 添加 的顺序计算新的兴趣列表
+            existing_preferences = user_doc.get("news_preferences", {})
+            existing_interests = [] if clear else existing_preferences.get("news_interests", [])
+            removed = set(interests_to_remove)
+            updated_interests = [interest for interest in existing_interests if interest not in removed]
+            for interest in interests_to_add:
+                if interest not in updated_interests:
+                    updated_interests.append(interest)
+            
+            # 限制数量（最多20个兴趣）
+            if len(updated_interests) > 20:
+                updated_interests = updated_interests[-20:]
+            
+            # 更新数据库
+            updated_preferences = UserPreferences(news_interests=updated_interests)
+            
+            result = await users_collection.update_one(
+                {"_id": object_id},
+                {
+                    "$set": {
+                        "news_preferences": updated_preferences.dict(),
+                        "updated_at": datetime.now()
+                    }
+                }
+            )
+            
+            success = result.matched_count > 0
+            if success:
+                logger.info(
+                    f"批量更新用户 {user_id} 兴趣: 清空={clear}, 添加={interests_to_add}, 移除={interests_to_remove}"
+                )
+            else:
+                logger.warning(f"用户 {user_id} 兴趣批量更新未生效")
+            
+            return success
+            
+        except Exception as e:
+            logger.error(f"批量更新用户兴趣失败: {str(e)}")
+            return False
+    
     async def get_user_interests(self, user_id: str) -> Optional[List[str]]:
         """
         获取用户兴趣列表
@@ -184,7 +287,10 @@ class UserInterestService:
                 logger.error(f"无效的用户ID格式: {user_id}, 错误: {e}")
                 return None
                 
-            user_doc = await users_collection.find_one({"_id": object_id})
+            user_doc = await users_collection.find_one(
+                {"_id": object_id},
+                {"news_preferences.news_interests": 1}
+            )
             
             if not user_doc:
                 logger.warning(f"用户不存在: {user_id}")
@@ -248,20 +354,27 @@ class UserInterestService:
             logger.error(f"清空用户兴趣失败: {str(e)}")
             return False
     
-    async def query_related_interests(self, user_id: str, keyword: str) -> List[str]:
+    async def query_related_interests(
+        self,
+        user_id: str,
+        keyword: str,
+        current_interests: Optional[List[str]] = None
+    ) -> List[str]:
         """
         智能查询与特定关键词相关的用户兴趣 - 支持语义理解
         
         Args:
             user_id: 用户ID
             keyword: 关键词
+            current_interests: 调用方已读取的用户兴趣列表，为None时从数据库读取
             
         Returns:
             List[str]: 相关的兴趣列表
         """
         try:
             # 获取用户当前所有兴趣
-            current_interests = await self.get_user_interests(user_id)
+            if current_interests is None:
+                current_interests = await self.get_user_interests(user_id)
             if not current_interests:
                 return []
             
@@ -293,26 +406,22 @@ class UserInterestService:
 请分析："""
             
             try:
-                from langchain_community.chat_models import ChatTongyi
                 from langchain_core.messages import HumanMessage, SystemMessage
-                from core.config import settings
                 
-                # 使用AI进行语义分析
-                llm = ChatTongyi(
-                    streaming=False,
-                    model="qwen-turbo", 
-                    dashscope_api_key=settings.DASHSCOPE_API_KEY
-                )
+                # 使用AI进行语义分析（复用同一个客户端）
+                llm = self._get_semantic_llm()
                 
                 messages = [
                     SystemMessage(content="你是一个专业的语义分析专家，擅长理解词汇之间的语义关联关系。"),
                     HumanMessage(content=semantic_analysis_prompt)
                 ]
                 
-                response = await llm.ainvoke(messages)
+                # 与智能体共享 LLM 并发上限
+                async with llm_semaphore:
+                    response = await llm.ainvoke(messages)
                 analysis_result = response.content.strip()
                 
-                print(f"语义分析结果: {analysis_result}")
+                logger.debug("语义分析结果: %s", analysis_result)
                 
                 # 解析AI分析结果
                 if analysis_result and analysis_result != "无相关兴趣":
@@ -473,6 +582,17 @@ async def remove_user_interests(user_id: str, interests: List[str]) -> bool:
     return await service.remove_user_interests(user_id, interests)
 
 
+async def update_user_interests(
+    user_id: str,
+    interests_to_add: List[str],
+    interests_to_remove: List[str],
+    clear: bool = False
+) -> bool:
+    """批量更新用户兴趣的简化接口"""
+    service = await get_user_interest_service()
+    return await service.update_user_interests(user_id, interests_to_add, interests_to_remove, clear)
+
+
 async def get_user_interests(user_id: str) -> Optional[List[str]]:
     """获取用户兴趣的简化接口"""
     service = await get_user_interest_service()
@@ -485,7 +605,11 @@ async def clear_user_interests(user_id: str) -> bool:
     return await service.clear_user_interests(user_id)
 
 
-async def query_related_interests(user_id: str, keyword: str) -> List[str]:
+async def query_related_interests(
+    user_id: str,
+    keyword: str,
+    current_interests: Optional[List[str]] = None
+) -> List[str]:
     """查询与特定关键词相关的用户兴趣的简化接口"""
     service = await get_user_interest_service()
-    return await service.query_related_interests(user_id, keyword)
\ No newline at end of file
+    return await service.query_related_interests(user_id, keyword, current_interests)
\ No newline at end of file
@@ -4,6 +4,8 @@
 """
 
 import asyncio
+import heapq
+import re
 import time
 from datetime import datetime, timedelta
 from typing import List, Dict, Any, Optional, Tuple
@@ -75,6 +77,10 @@ class PersonalizationResponse(BaseModel):
 class UserMemoryService:
     """用户记忆管理服务"""
     
+    # 预编译的标点清理规则和停用词
+    _NON_WORD_RE = re.compile(r'[^\w\s]')
+    _STOP_WORDS = frozenset({'的', '了', '在', '是', '我', '有', '和', '就', '不', '人', '都', '一', '一个', '上', '也', '很', '到', '说', '要', '去', '你', '会', '着', '没有', '看', '好', '自己', '这'})
+    
     def __init__(self):
         self.embedding_service = None
         self.vector_db = None
@@ -263,15 +269,12 @@ class UserMemoryService:
     async def _extract_keywords(self, content: str) -> List[str]:
         """提取关键词"""
         # 简单的关键词提取，实际项目中可以使用更复杂的NLP技术
-        import re
-        
         # 清理文本
-        content = re.sub(r'[^\w\s]', ' ', content.lower())
+        content = self._NON_WORD_RE.sub(' ', content.lower())
         words = content.split()
         
         # 过滤停用词和短词
-        stop_words = {'的', '了', '在', '是', '我', '有', '和', '就', '不', '人', '都', '一', '一个', '上', '也', '很', '到', '说', '要', '去', '你', '会', '着', '没有', '看', '好', '自己', '这'}
-        keywords = [word for word in words if len(word) > 1 and word not in stop_words]
+        keywords = [word for word in words if len(word) > 1 and word not in self._STOP_WORDS]
         
         # 返回前20个关键词
         return keywords[:20]
@@ -299,7 +302,7 @@ class UserMemoryService:
             
             # 获取用户最感兴趣的话题
             interests = user_prefs["interests"]
-            top_interests = sorted(interests.items(), key=lambda x: x[1], reverse=True)[:5]
+            top_interests = heapq.nlargest(5, interests.items(), key=lambda x: x[1])
             
             recommendations = []
             for interest, _ in top_interests:
@@ -312,6 +315,20 @@ class UserMemoryService:
             logger.error(f"生成推荐失败: {e}")
             return ["推荐新闻", "热点话题"]
     
+    async def _get_behavior_stats(self, user_id: str) -> Dict[str, int]:
+        """一次聚合统计用户各类行为的次数"""
+        stats = {action: 0 for action in self.behavior_weights}
+        try:
+            pipeline = [
+                {"$match": {"user_id": user_id, "action": {"$in": list(self.behavior_weights)}}},
+                {"$group": {"_id": "$action", "count": {"$sum": 1}}}
+            ]
+            async for doc in self.db[Collections.API_LOGS].aggregate(pipeline):
+                stats[doc["_id"]] = doc["count"]
+        except Exception as e:
+            logger.error(f"统计用户行为失败: {e}")
+        return stats
+    
     async def _calculate_personalization_score(self, user_id: str) -> float:
         """计算个性化分数"""
         try:
@@ -342,7 +359,7 @@ class UserMemoryService:
                 return {}
             
             interests = user_prefs.get("interests", {})
-            top_interests = sorted(interests.items(), key=lambda x: x[1], reverse=True)[:10]
+            top_interests = heapq.nlargest(10, interests.items(), key=lambda x: x[1])
             
             return {
                 "top_interests": [{"keyword": k, "weight": v} for k, v in top_interests],
@@ -363,7 +380,7 @@ class UserMemoryService:
                 return []
             
             interests = user_prefs["interests"]
-            top_interests = sorted(interests.items(), key=lambda x: x[1], reverse=True)[:3]
+            top_interests = heapq.nlargest(3, interests.items(), key=lambda x: x[1])
             
             queries = []
             for interest, _ in top_interests:
@@ -387,17 +404,20 @@ class UserMemoryService:
                 return []
             
             interests = user_prefs["interests"]
-            top_keywords = list(sorted(interests.items(), key=lambda x: x[1], reverse=True)[:5])
+            top_keywords = heapq.nlargest(5, interests.items(), key=lambda x: x[1])
             
             recommendations = []
             for keyword, weight in top_keywords:
                 # 搜索包含关键词的新闻
-                news_items = await self.db[Collections.NEWS].find({
-                    "$or": [
-                        {"title": {"$regex": keyword, "$options": "i"}},
-                        {"content": {"$regex": keyword, "$options": "i"}}
-                    ]
-                }).limit(2).to_list(length=2)
+                news_items = await self.db[Collections.NEWS].find(
+                    {
+                        "$or": [
+                            {"title": {"$regex": keyword, "$options": "i"}},
+                            {"content": {"$regex": keyword, "$options": "i"}}
+                        ]
+                    },
+                    projection={"title": 1, "content": 1, "url": 1, "source": 1}
+                ).limit(2).to_list(length=2)
                 
                 for news in news_items:
                     recommendations.append({
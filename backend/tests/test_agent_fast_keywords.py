@@ -0,0 +1,37 @@
+"""
+智能对话关键词规则提取测试
+"""
+
+import sys
+import os
+# 将 backend 目录放到 sys.path 首位，确保优先使用本地 services 包
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.news_agent_service import NewsAgentService
+
+
+def _make_agent():
+    """构造不连接模型与数据库的智能体实例"""
+    return NewsAgentService.__new__(NewsAgentService)
+
+
+def test_verbs_and_fillers_fall_back_to_llm():
+    """含动词或口语疑问词的短句不做规则提取，避免写入用户兴趣"""
+    agent = _make_agent()
+    for message in ["今天发生了什么大事", "给我看看科技新闻", "特朗普最近干嘛了"]:
+        assert agent._fast_extract_keywords(message) is None, message
+
+
+def test_noun_topics_are_extracted():
+    """只含名词主题与时间词的短句直接提取"""
+    agent = _make_agent()
+    assert agent._fast_extract_keywords("特斯拉新闻") == (["特斯拉"], "1w")
+    assert agent._fast_extract_keywords("今天的股市新闻") == (["股市"], "1d")
+    assert agent._fast_extract_keywords("AI最近的新闻") == (["AI"], "1w")
+
+
+if __name__ == "__main__":
+    test_verbs_and_fillers_fall_back_to_llm()
+    print("✅ 动词与口语短句交由 LLM 处理")
+    test_noun_topics_are_extracted()
+    print("✅ 名词主题规则提取")
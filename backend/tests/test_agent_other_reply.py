@@ -0,0 +1,115 @@
+"""
+智能对话（其它意图）流式回复测试
+"""
+
+import asyncio
+import sys
+import os
+from types import SimpleNamespace
+# 将 backend 目录放到 sys.path 首位，确保优先使用本地 services 包
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langchain_core.messages import HumanMessage, SystemMessage
+
+from services.news_agent_service import NewsAgentService
+
+
+class _FakeLLM:
+    """按预设的片段与间隔流式输出；fail_after 个片段后抛出异常"""
+
+    def __init__(self, parts, delay=0.0, first_delay=0.0, fail_after=None):
+        self.parts = parts
+        self.delay = delay
+        self.first_delay = first_delay
+        self.fail_after = fail_after
+
+    async def astream(self, messages):
+        await asyncio.sleep(self.first_delay)
+        for i, part in enumerate(self.parts):
+            if self.fail_after is not None and i == self.fail_after:
+                raise RuntimeError("上游连接中断")
+            if i:
+                await asyncio.sleep(self.delay)
+            yield SimpleNamespace(content=part)
+
+
+def _make_agent(llm, timeout):
+    """构造不连接模型与数据库的智能体实例"""
+    agent = NewsAgentService.__new__(NewsAgentService)
+    agent.llm = llm
+    agent.OTHER_CHAT_TIMEOUT = timeout
+    agent._sys_other_chat = SystemMessage(content="system")
+    return agent
+
+
+def _run_handle_other(agent):
+    """运行 _handle_other，返回 (保存的回复, 推送的片段)"""
+    pushed = []
+
+    async def on_token(token):
+        pushed.append(token)
+
+    state = {"messages": [HumanMessage(content="你好")], "token_callback": on_token}
+    state = asyncio.run(agent._handle_other(state))
+    return state["messages"][-1].content, pushed
+
+
+def test_slow_stream_after_first_token_is_not_cut_off():
+    """首个片段按时到达后，后续片段不受超时限制，保存的回复与推送内容一致"""
+    agent = _make_agent(_FakeLLM(["你", "好", "呀"], delay=0.05), timeout=0.03)
+
+    reply, pushed = _run_handle_other(agent)
+
+    assert pushed == ["你", "好", "呀"]
+    assert reply == "你好呀"
+
+
+def test_no_first_token_before_timeout_uses_fallback():
+    """首个片段超时未到达时使用备用回复，并把备用回复推送给客户端"""
+    agent = _make_agent(_FakeLLM(["迟到的回复"], first_delay=0.2), timeout=0.03)
+
+    reply, pushed = _run_handle_other(agent)
+
+    assert pushed == [NewsAgentService.OTHER_CHAT_FALLBACK_REPLY]
+    assert reply == NewsAgentService.OTHER_CHAT_FALLBACK_REPLY
+
+
+def test_failure_mid_stream_keeps_pushed_text():
+    """中途失败时保存已推送的部分文本，而不是备用回复"""
+    agent = _make_agent(_FakeLLM(["今天", "天气", "不错"], fail_after=2), timeout=1)
+
+    reply, pushed = _run_handle_other(agent)
+
+    assert pushed == ["今天", "天气"]
+    assert reply == "今天天气"
+
+
+def test_stream_user_message_yields_tokens_then_done():
+    """stream_user_message 先逐段产出 token 事件，最后产出 done 事件"""
+    agent = NewsAgentService.__new__(NewsAgentService)
+
+    async def process_user_message(user_id, session_id, message, on_token=None):
+        for token in ["新", "闻"]:
+            await on_token(token)
+        return {"success": True, "response": "新闻"}
+
+    agent.process_user_message = process_user_message
+
+    async def collect():
+        return [event async for event in agent.stream_user_message("u", "s", "hi")]
+
+    events = asyncio.run(collect())
+
+    assert events == [
+        {"event": "token", "data": "新"},
+        {"event": "token", "data": "闻"},
+        {"event": "done", "data": {"success": True, "response": "新闻"}},
+    ]
+
+
+if __name__ == "__main__":
+    test_slow_stream_after_first_token_is_not_cut_off()
+    test_no_first_token_before_timeout_uses_fallback()
+    test_failure_mid_stream_keeps_pushed_text()
+    test_stream_user_message_yields_tokens_then_done()
+    print("✅ 智能对话流式回复测试通过！")
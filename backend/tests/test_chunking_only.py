@@ -95,7 +95,57 @@ def test_text_chunking():
         return False
 
 
+def _reference_character_split(chunker, text):
+    """逐字符增长窗口并重新计数的原始实现，用作对照"""
+    res = []
+    start = 0
+    while start < len(text):
+        end = start
+        tokens = 0
+        while end < len(text) and tokens < chunker.chunk_size:
+            end += 1
+            tokens = chunker.count_tokens(text[start:end])
+        if end < len(text):
+            while end > start and text[end-1] not in [" ", "\n", "\t"]:
+                end -= 1
+            if end == start:
+                end = start + chunker.chunk_size
+        chunk = text[start:end].strip()
+        if chunk:
+            res.append(chunk)
+        start = end
+    return res
+
+
+def test_character_split_long_unbroken_text():
+    """无分隔符长文本：一次编码的字符级切分与原始实现对照"""
+    chunker = RecursiveTextChunker(chunk_size=64, chunk_overlap=0)
+    
+    unbroken = {
+        "CJK": "人工智能是计算机科学的一个分支它企图了解智能的实质并生产出一种新的能以人类智能相似的方式做出反应的智能机器" * 20,
+        "ASCII": "artificialintelligenceisabranchofcomputersciencethatattemptstounderstandtheessenceofintelligence" * 20,
+    }
+    
+    for name, text in unbroken.items():
+        chunks = chunker._character_split(text)
+        reference = _reference_character_split(chunker, text)
+        
+        # 没有空白可回退时两种实现都按 chunk_size 个字符切分，结果应完全相同
+        assert chunks == reference, name
+        assert "".join(chunks) == text, name
+        print(f"  {name}: {len(chunks)} 块，与原始实现一致")
+    
+    # 含空白的文本：每块单独计数不超过上限（BPE 在窗口边缘的切分可能不同，不要求边界逐一相同）
+    spaced = "artificial intelligence is a branch of computer science " * 40
+    chunks = chunker._character_split(spaced)
+    reference = _reference_character_split(chunker, spaced)
+    assert " ".join(chunks).split() == spaced.split()
+    for chunk in chunks:
+        assert chunker.count_tokens(chunk) <= chunker.chunk_size
+    print(f"  含空白文本: {len(chunks)} 块（原始实现 {len(reference)} 块）")
+
 if __name__ == "__main__":
+    test_character_split_long_unbroken_text()
     success = test_text_chunking()
     if success:
         print("\n🎉 所有测试通过！")
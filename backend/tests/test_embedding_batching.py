@@ -0,0 +1,70 @@
+"""
+跨文本批量嵌入的失败范围测试
+"""
+
+import asyncio
+import sys
+import os
+from types import SimpleNamespace
+# 将 backend 目录放到 sys.path 首位，确保优先使用本地 services 包
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.embedding_service import QWenEmbeddingService
+
+
+def _make_service(batch_size: int) -> QWenEmbeddingService:
+    """构造不连接外部 API 的服务：分块按 '|' 切分，含 'BAD' 的分块使整个批次请求失败"""
+    service = QWenEmbeddingService.__new__(QWenEmbeddingService)
+    service.model_name = "text-embedding-v3"
+    service.batch_size = batch_size
+    service.calls = []
+
+    async def chunk_text(text, metadata=None):
+        return [SimpleNamespace(content=part) for part in text.split("|")]
+
+    async def generate_embeddings_batch(contents):
+        service.calls.append(list(contents))
+        if any("BAD" in content for content in contents):
+            raise ValueError("API 拒绝了该批次")
+        return [[float(len(content))] for content in contents]
+
+    service.chunk_text = chunk_text
+    service.generate_embeddings_batch = generate_embeddings_batch
+    return service
+
+
+def test_failing_text_does_not_empty_batch_neighbours():
+    """一个文本的分块被拒绝时，同批次中其他文本的结果保留"""
+    service = _make_service(batch_size=10)
+
+    results = asyncio.run(service.process_texts_batch(
+        ["a1|a2", "b1|BAD", "c1"],
+        ["a", "b", "c"]
+    ))
+
+    assert [r.chunk.content for r in results[0]] == ["a1", "a2"]
+    assert results[1] == []
+    assert [r.chunk.content for r in results[2]] == ["c1"]
+    # 首次混合批次失败后按文本拆分重试
+    assert service.calls[0] == ["a1", "a2", "b1", "BAD", "c1"]
+    assert len(service.calls) == 4
+
+
+def test_text_spanning_batches_keeps_chunk_order():
+    """跨批次的文本分块按原顺序分发回该文本"""
+    service = _make_service(batch_size=2)
+
+    results = asyncio.run(service.process_texts_batch(
+        ["a1|a2|a3", "b1"],
+        ["a", "b"]
+    ))
+
+    assert [r.chunk.content for r in results[0]] == ["a1", "a2", "a3"]
+    assert [r.chunk.content for r in results[1]] == ["b1"]
+    assert len(service.calls) == 2
+
+
+if __name__ == "__main__":
+    test_failing_text_does_not_empty_batch_neighbours()
+    test_text_spanning_batches_keeps_chunk_order()
+    print("✅ 批量嵌入测试通过！")
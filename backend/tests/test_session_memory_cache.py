@@ -0,0 +1,82 @@
+"""
+会话记忆存储缓存一致性测试
+"""
+
+import asyncio
+import sys
+import os
+# 将 backend 目录放到 sys.path 首位，确保优先使用本地 services 包
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.memory_mongo import SessionMemoryStore
+
+
+class _FakeCollection:
+    """内存中的记忆集合，update_one 按 write_delay 延迟落库"""
+
+    def __init__(self, write_delay=0.0):
+        self.docs = {}
+        self.write_delay = write_delay
+
+    async def find_one(self, query, projection=None):
+        doc = self.docs.get(query["_id"])
+        return {"memory": doc} if doc is not None else None
+
+    async def update_one(self, query, update, upsert=False):
+        await asyncio.sleep(self.write_delay)
+        self.docs[query["_id"]] = update["$set"]["memory"]
+
+    async def delete_one(self, query):
+        self.docs.pop(query["_id"], None)
+
+
+def _make_store(collection):
+    """构造使用内存集合、开启进程内缓存的记忆存储"""
+    store = SessionMemoryStore()
+    store.cache_enabled = True
+
+    async def get_collection():
+        return collection
+
+    store._get_collection = get_collection
+    return store
+
+
+def test_load_waits_for_pending_background_save():
+    """后台保存未完成时读取会等待其落库，读到并缓存的是新记忆"""
+    collection = _FakeCollection(write_delay=0.05)
+    collection.docs["s"] = {"turn": 1}
+    store = _make_store(collection)
+
+    async def run():
+        save = asyncio.create_task(store.save_memory_async("s", {"turn": 2}))
+        await asyncio.sleep(0)
+        loaded = await store.get_memory_async("s")
+        await save
+        return loaded
+
+    assert asyncio.run(run()) == {"turn": 2}
+    assert store._get_cached("s") == (True, {"turn": 2})
+
+
+def test_write_on_other_session_does_not_block_caching():
+    """其它会话的写入不影响本会话读取结果回填缓存"""
+    collection = _FakeCollection(write_delay=0.05)
+    collection.docs["a"] = {"turn": 1}
+    store = _make_store(collection)
+
+    async def run():
+        save = asyncio.create_task(store.save_memory_async("b", {"turn": 1}))
+        await asyncio.sleep(0)
+        loaded = await store.get_memory_async("a")
+        await save
+        return loaded
+
+    assert asyncio.run(run()) == {"turn": 1}
+    assert store._get_cached("a") == (True, {"turn": 1})
+
+
+if __name__ == "__main__":
+    test_load_waits_for_pending_background_save()
+    test_write_on_other_session_does_not_block_caching()
+    print("✅ 会话记忆缓存一致性测试通过！")
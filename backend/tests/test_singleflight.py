@@ -0,0 +1,92 @@
+"""
+请求合并（single-flight）测试
+"""
+
+import asyncio
+import sys
+import os
+# 将 backend 目录放到 sys.path 首位，确保优先使用本地 core 包
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.singleflight import SingleFlight, flight_key
+
+
+def test_concurrent_calls_share_one_execution():
+    """同键并发调用只执行一次并共享结果"""
+
+    async def run():
+        flight = SingleFlight()
+        calls = 0
+
+        async def work():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return {"answer": 42}
+
+        key = flight_key("news", "问题", 5, 0.7)
+        results = await asyncio.gather(*[flight.do(key, work) for _ in range(5)])
+
+        assert calls == 1
+        assert all(result is results[0] for result in results)
+        assert not flight._inflight
+
+    asyncio.run(run())
+
+
+def test_cancelled_first_caller_does_not_cancel_followers():
+    """首个调用者被取消时，其他等待者仍拿到结果"""
+
+    async def run():
+        flight = SingleFlight()
+        calls = 0
+
+        async def work():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.05)
+            return "done"
+
+        leader = asyncio.ensure_future(flight.do("key", work))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(flight.do("key", work))
+        await asyncio.sleep(0.01)
+
+        leader.cancel()
+        assert await follower == "done"
+        assert leader.cancelled()
+        assert calls == 1
+        assert not flight._inflight
+
+    asyncio.run(run())
+
+
+def test_error_propagates_to_all_callers_and_clears_key():
+    """执行失败时所有等待者收到同一异常，之后同键可重新执行"""
+
+    async def run():
+        flight = SingleFlight()
+
+        async def fail():
+            await asyncio.sleep(0.01)
+            raise ValueError("boom")
+
+        results = await asyncio.gather(
+            flight.do("key", fail), flight.do("key", fail), return_exceptions=True
+        )
+        assert all(isinstance(result, ValueError) for result in results)
+        assert not flight._inflight
+
+        async def succeed():
+            return "ok"
+
+        assert await flight.do("key", succeed) == "ok"
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    test_concurrent_calls_share_one_execution()
+    test_cancelled_first_caller_does_not_cancel_followers()
+    test_error_propagates_to_all_callers_and_clears_key()
+    print("✅ 请求合并测试通过！")
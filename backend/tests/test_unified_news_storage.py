@@ -0,0 +1,84 @@
+"""
+统一新闻服务存储测试
+"""
+
+import asyncio
+import sys
+import os
+from types import SimpleNamespace
+# 将 backend 目录放到 sys.path 首位，确保优先使用本地 services 包
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pymongo.errors import BulkWriteError
+
+import services.unified_news_service as unified_news_module
+from services.unified_news_service import UnifiedNewsService
+
+
+class _FakeCursor:
+    """异步迭代的查询结果"""
+
+    def __init__(self, docs):
+        self.docs = docs
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for doc in self.docs:
+            yield doc
+
+
+class _FakeCollection:
+    """insert_many 时按 failed_urls 模拟部分写入失败"""
+
+    def __init__(self, failed_urls):
+        self.failed_urls = failed_urls
+        self.inserted = []
+
+    def find(self, *args, **kwargs):
+        return _FakeCursor([])
+
+    async def insert_many(self, docs, ordered=True):
+        write_errors = []
+        for index, doc in enumerate(docs):
+            if doc["url"] in self.failed_urls:
+                write_errors.append({"index": index, "code": 11000, "errmsg": "duplicate key"})
+            else:
+                self.inserted.append(doc)
+        if write_errors:
+            raise BulkWriteError({"writeErrors": write_errors, "nInserted": len(self.inserted)})
+        return SimpleNamespace(inserted_ids=[doc["_id"] for doc in docs])
+
+
+def _article(link):
+    return SimpleNamespace(
+        title=f"标题 {link}", snippet="摘要", link=link,
+        source="来源", position=1, thumbnail=None
+    )
+
+
+def test_partial_insert_failure_drops_unwritten_articles():
+    """insert_many 部分失败时，只返回实际写入的新闻"""
+    collection = _FakeCollection(failed_urls={"https://b"})
+
+    async def get_db():
+        return {unified_news_module.Collections.NEWS: collection}
+
+    original = unified_news_module.get_mongodb_database
+    unified_news_module.get_mongodb_database = get_db
+    try:
+        service = UnifiedNewsService.__new__(UnifiedNewsService)
+        articles = [_article("https://a"), _article("https://b"), _article("https://c")]
+        stored_news, storage_count = asyncio.run(service._store_news_articles(articles, "u"))
+    finally:
+        unified_news_module.get_mongodb_database = original
+
+    assert storage_count == 2
+    assert [news.url for news in stored_news] == ["https://a", "https://c"]
+    assert {news.id for news in stored_news} == {str(doc["_id"]) for doc in collection.inserted}
+
+
+if __name__ == "__main__":
+    test_partial_insert_failure_drops_unwritten_articles()
+    print("✅ 部分写入失败时只返回已写入的新闻")
@@ -6,7 +6,6 @@
 import asyncio
 import requests
 import json
-import time
 import sys
 import os
 
@@ -237,7 +236,6 @@ async def main():
         
         if vectorization_ok:
             print("\n✅ 向量化成功，测试RAG对话...")
-            time.sleep(2)  # 等待向量化完成
             rag_ok = test_rag_chat()
             
             if rag_ok:
@@ -5,7 +5,6 @@
 
 import requests
 import json
-import time
 
 BASE_URL = "http://localhost:8000"
 
@@ -114,15 +113,9 @@ def main():
     # 测试健康检查
     results.append(test_health())
     
-    # 等待一下
-    time.sleep(1)
-    
     # 测试增强对话API
     results.append(test_enhanced_chat())
     
-    # 等待一下
-    time.sleep(2)
-    
     # 测试新闻处理流水线API
     results.append(test_news_pipeline())
     
@@ -18,7 +18,12 @@ TEST_USER = {
 
 class IntegrationTester:
     def __init__(self):
-        self.client = httpx.AsyncClient(timeout=30.0)
+        # 所有测试共用一个长连接客户端，复用 TCP 连接，避免每个请求重新握手
+        self.client = httpx.AsyncClient(
+            base_url=BASE_URL,
+            limits=httpx.Limits(max_connections=100, max_keepalive_connections=20, keepalive_expiry=300),
+            timeout=httpx.Timeout(30.0, connect=10.0)
+        )
         self.token = None
         self.user_id = None
     
@@ -26,7 +31,7 @@ class IntegrationTester:
         """测试健康检查"""
         print("🔍 测试健康检查...")
         try:
-            response = await self.client.get(f"{BASE_URL}/health")
+            response = await self.client.get("/health")
             if response.status_code == 200:
                 print("✅ 健康检查通过")
                 return True
@@ -42,7 +47,7 @@ class IntegrationTester:
         print("🔍 测试用户注册...")
         try:
             response = await self.client.post(
-                f"{BASE_URL}/api/user/auth/register",
+                "/api/user/auth/register",
                 json=TEST_USER
             )
             
@@ -66,7 +71,7 @@ class IntegrationTester:
         print("🔍 测试用户登录...")
         try:
             response = await self.client.post(
-                f"{BASE_URL}/api/user/auth/login",
+                "/api/user/auth/login",
                 json={
                     "username": TEST_USER["username"],
                     "password": TEST_USER["password"]
@@ -103,7 +108,7 @@ class IntegrationTester:
             
             # 测试健康检查
             response = await self.client.get(
-                f"{BASE_URL}/api/unified-news/health",
+                "/api/unified-news/health",
                 headers=headers
             )
             
@@ -115,7 +120,7 @@ class IntegrationTester:
             
             # 测试快速搜索
             response = await self.client.post(
-                f"{BASE_URL}/api/unified-news/quick-search",
+                "/api/unified-news/quick-search",
                 params={"query": "人工智能"},
                 headers=headers
             )
@@ -141,7 +146,7 @@ class IntegrationTester:
         print("🔍 测试传统新闻搜索...")
         try:
             response = await self.client.get(
-                f"{BASE_URL}/api/news/search",
+                "/api/news/search",
                 params={
                     "query": "科技新闻",
                     "num_results": 5,
@@ -181,14 +186,18 @@ class IntegrationTester:
         passed = 0
         total = len(tests)
         
-        for test_name, test_func in tests:
-            print(f"\n📋 {test_name}")
-            try:
-                result = await test_func()
-                if result:
-                    passed += 1
-            except Exception as e:
-                print(f"❌ {test_name} 异常: {e}")
+        try:
+            for test_name, test_func in tests:
+                print(f"\n📋 {test_name}")
+                try:
+                    result = await test_func()
+                    if result:
+                        passed += 1
+                except Exception as e:
+                    print(f"❌ {test_name} 异常: {e}")
+        finally:
+            # 中途中断（如 Ctrl+C）时也要关闭连接池
+            await self.client.aclose()
         
         print("\n" + "=" * 50)
         print(f"📊 测试结果: {passed}/{total} 通过")
@@ -197,8 +206,6 @@ class IntegrationTester:
             print("🎉 所有测试通过！项目重构成功！")
         else:
             print("⚠️  部分测试失败，请检查相关功能")
-        
-        await self.client.aclose()
 
 async def main():
     """主函数"""
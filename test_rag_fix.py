@@ -6,7 +6,6 @@
 import asyncio
 import requests
 import json
-import time
 
 # 测试配置
 BASE_URL = "http://localhost:8000"
@@ -62,10 +61,6 @@ async def test_rag_conversation():
         print(f"❌ 新闻处理异常: {e}")
         return False
     
-    # 等待一下让向量化完成
-    print("\n⏳ 等待向量化完成...")
-    time.sleep(3)
-    
     # 2. 测试RAG对话
     print("\n🤖 步骤2: 测试RAG对话...")
     